@@ -1,55 +1,128 @@
+import time
+_SCRIPT_STARTED = time.perf_counter()  # 시작 시간 측정용 (맨 아래 _record_startup)
 import streamlit as st
 import gspread
 from google.oauth2.service_account import Credentials
 import pandas as pd
-import difflib
 import datetime
 import os
 import base64
-import io, json
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from googleapiclient.errors import HttpError
+import math
+import io, json, re
+import importlib.util
+import threading
+import uuid
+import logging
+from qa_core import (
+    DEFAULT_EMBED_MODEL, DriveUploader, PerfStats, QASnapshot, SemanticIndex, SimilarSuggester, SubmissionQueue,
+    ThumbnailCache, current_session, instrument_gspread, is_duplicate_question,
+    load_sentence_model, make_thumbnail, parse_attachments, sheet_revision, timed_http_request_class,
+)
+from qa_replica import SQLiteReplica, start_background_sync
+from qa_bulk import bulk_import, iter_csv_chunks, iter_records, write_xlsx
+# googleapiclient(Drive), sentence-transformers(torch)는 무거우므로 실제로 쓸 때 함수 안에서 import
+_IMPORTS_DONE = time.perf_counter()
+
+@st.cache_resource(show_spinner=False)
+def attach_log_handler(name: str, level: int) -> logging.Logger:
+    """로거에 stderr 핸들러를 한 번만 붙임 (재실행마다 붙으면 같은 줄이 여러 번 찍힘). 루트 설정이 없어도 INFO/DEBUG가 나옴."""
+    logger = logging.getLogger(name)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+log = attach_log_handler("mqa", logging.INFO)  # 콜드스타트 로그, mqa.perf(JSON 호출 로그)도 여기로
 DEBUG_UPLOAD = bool(st.secrets.get("debug_upload", False))  # 기본 False면 화면에 아무 로그도 안 뜸
+PERF_PANEL = bool(st.secrets.get("perf_panel", False))  # 관리자용 성능 계측 패널 (맨 아래)
+PERF_LOG = bool(st.secrets.get("perf_log", False))      # 시트/Drive 호출마다 JSON 한 줄 로그 (분당·세션별 쿼터 집계용)
+
+@st.cache_resource(show_spinner=False)
+def get_perf_stats() -> PerfStats:
+    # 계측은 항상 켜 둠(호출당 dict 갱신 정도) — 패널/로그만 secrets로 켬
+    return PerfStats(emit_logs=PERF_LOG, logger=logging.getLogger("mqa.perf"))
+
+perf = get_perf_stats()
+
 
+TITLE_IMAGE_WIDTH = 85  # 인삿말 옆 캐릭터 표시 폭(px)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 
-def get_character_img_base64(img_path):
+@st.cache_resource(show_spinner=False)
+def get_character_img_src(img_path: str, mtime: float, width: int = TITLE_IMAGE_WIDTH):
+    """
+    캐릭터 이미지 src를 프로세스당 한 번만 만듦 (원본이 바뀌면 mtime으로 다시 만듦).
+    정적 서빙(server.enableStaticServing)이 켜져 있으면 static/ 파일 URL, 아니면 작은 data URI.
+    """
+    # 고해상도 화면 대비 표시 폭의 2배로 줄여서 WebP 재압축 (2.4MB PNG → 수 KB)
+    # make_thumbnail은 긴 변 기준 → 세로형(2:3) 캐릭터 이미지도 폭이 2배가 되도록 폭×3
+    with open(img_path, "rb") as f:
+        data = make_thumbnail(f.read(), width * 3)
+    if st.get_option("server.enableStaticServing"):
+        name = f"{os.path.splitext(os.path.basename(img_path))[0]}_{width}.webp"
+        try:
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            tmp_path = os.path.join(STATIC_DIR, name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, os.path.join(STATIC_DIR, name))
+            return f"app/static/{name}?v={int(mtime)}"
+        except OSError:
+            pass  # 쓰기 불가 환경 → data URI로
+    return "data:image/webp;base64," + base64.b64encode(data).decode("utf-8")
+
+def get_character_img(img_path):
     if os.path.exists(img_path):
-        with open(img_path, "rb") as img_file:
-            b64 = base64.b64encode(img_file.read()).decode("utf-8")
-            return f"data:image/webp;base64,{b64}"
+        return get_character_img_src(img_path, os.path.getmtime(img_path))
     return None
 
-def is_duplicate_question(new_question, existing_questions, threshold=0.85):
-    for q in existing_questions:
-        similarity = difflib.SequenceMatcher(None, new_question.strip(), q.strip()).ratio()
-        if similarity > threshold:
-            return True
-    return False
-
-# 🔐 구글 인증
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-credentials = Credentials.from_service_account_info(
-    st.secrets["gcp_service_account"],
-    scopes=scope
-)
-gc = gspread.authorize(credentials)
-
-DRIVE_SCOPES = [
+# 🔐 구글 인증 — 자격증명/클라이언트는 프로세스당 한 번만 만들어 모든 세션이 재사용
+# (토큰은 만료됐을 때만 갱신되고, gspread 세션의 keep-alive 연결도 그대로 재사용됨)
+GOOGLE_SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
     "https://www.googleapis.com/auth/drive.file",
-    "https://www.googleapis.com/auth/spreadsheets",
 ]
 
-def _get_drive_creds():
+@st.cache_resource(show_spinner=False)
+def get_credentials():
     info = st.secrets["gcp_service_account"]
     if isinstance(info, str):
         info = json.loads(info)
-    return Credentials.from_service_account_info(info, scopes=DRIVE_SCOPES)
+    return Credentials.from_service_account_info(info, scopes=GOOGLE_SCOPES)
+
+@st.cache_resource(show_spinner=False)
+def get_gspread_client():
+    return instrument_gspread(gspread.authorize(get_credentials()), get_perf_stats())
 
 @st.cache_resource(show_spinner=False)
 def get_drive_client():
-    return build("drive", "v3", credentials=_get_drive_creds())
+    from googleapiclient.discovery import build
+    return build(
+        "drive", "v3", credentials=get_credentials(), cache_discovery=False,
+        requestBuilder=timed_http_request_class(get_perf_stats()),
+    )
+
+def new_drive_http(creds=None):
+    """
+    Drive 요청용 새 연결. httplib2는 스레드 안전하지 않으므로 공용 drive 클라이언트의 기본 http는
+    여러 스레드가 같이 쓰면 안 됨 → 스레드(작업)마다 만들어 execute(http=...)/next_chunk(http=...)로 넘김.
+    """
+    import google_auth_httplib2
+    import httplib2
+    return google_auth_httplib2.AuthorizedHttp(creds or get_credentials(), http=httplib2.Http(timeout=300))
+
+_drive_http_local = threading.local()
+
+def thread_drive_http():
+    """지금 스레드 전용 Drive 연결 (스크립트 스레드의 미리보기 조회 등)."""
+    http = getattr(_drive_http_local, "http", None)
+    if http is None:
+        http = _drive_http_local.http = new_drive_http()
+    return http
 
 DRIVE_UPLOAD_FOLDER_ID = (
     st.secrets.get("drive_upload_folder_id")
@@ -58,151 +131,215 @@ DRIVE_UPLOAD_FOLDER_ID = (
 DRIVE_LINK_SHARING = st.secrets.get("drive_link_sharing", "anyone")  # "anyone" | "domain"
 ORG_DOMAIN_FOR_DRIVE = "chunghobb.com"  # 사내용 공유("domain")을 쓰는 경우 실제 조직 도메인으로 맞추기
 
+FOLDER_CACHE_TTL_SEC = float(st.secrets.get("upload_folder_cache_ttl_sec", 3600))
+FOLDER_NEGATIVE_TTL_SEC = 60.0  # 폴더를 못 찾은 결과도 잠시 기억 (실패 시 매 제출마다 탐색 반복 방지)
+UPLOAD_MAX_WORKERS = int(st.secrets.get("upload_max_workers", 4))
+if DEBUG_UPLOAD:
+    attach_log_handler("qa_core", logging.DEBUG)  # 업로드 폴더 확정 과정 로그 (서버 stderr)
 
-def _image_embed_url(file_id: str) -> str:
-    return f"https://drive.google.com/uc?export=view&id={file_id}"
-
-def _pdf_preview_url(file_id: str) -> str:
-    return f"https://drive.google.com/file/d/{file_id}/preview"
-
-def resolve_upload_folder_id(drive, *, force_search=False) -> str:
+@st.cache_resource(show_spinner=False)
+def get_drive_uploader(sheet_key: str) -> DriveUploader:
     """
-    1) secrets의 폴더ID가 유효하면 그대로 사용(무로그)
-    2) 아니면 공유드라이브에서 '업로드용'(또는 지정명) 폴더를 조용히 찾아 대체
+    첨부 업로드(로직은 qa_core.DriveUploader) — 폴더 확정 캐시·업로드 기록을 모든 세션이 공유.
+    등록 대기열 작업 스레드에서 쓰이므로 st.*/secrets는 여기서 미리 읽어 넘김.
     """
-    # 0) secrets에서 우선 ID 얻기
-    folder_id = (
-        st.secrets.get("drive_upload_folder_id")
-        or (st.secrets.get("google", {}) or {}).get("uploads_folder_id", "")
+    creds = get_credentials()
+    google = st.secrets.get("google", {}) or {}
+    snapshot = get_qa_snapshot(sheet_key)
+    return DriveUploader(
+        get_drive_client(),
+        http_factory=lambda: new_drive_http(creds),
+        folder_id=DRIVE_UPLOAD_FOLDER_ID,
+        shared_drive_id=google.get("shared_drive_id", ""),
+        folder_name=google.get("uploads_folder_name", "업로드용"),
+        link_sharing=DRIVE_LINK_SHARING,
+        org_domain=ORG_DOMAIN_FOR_DRIVE,
+        find_existing=snapshot.attachment_by_hash,  # 시트의 첨부_JSON에 이미 있는 같은 내용
+        max_workers=UPLOAD_MAX_WORKERS,
+        folder_cache_ttl_sec=FOLDER_CACHE_TTL_SEC,
+        folder_negative_ttl_sec=FOLDER_NEGATIVE_TTL_SEC,
+        perf=get_perf_stats(),
     )
-    shared_drive_id = (st.secrets.get("google", {}) or {}).get("shared_drive_id", "")
-    folder_name     = (st.secrets.get("google", {}) or {}).get("uploads_folder_name", "업로드용")
 
-    # 1) ID가 있고 강제탐색이 아니면 유효성 검증(조용히)
-    if folder_id and not force_search:
-        try:
-            drive.files().get(fileId=folder_id, supportsAllDrives=True, fields="id").execute()
-            st.session_state["resolved_upload_folder_id"] = folder_id
-            if DEBUG_UPLOAD: st.caption(f"📁 folder ok: {folder_id}")
-            return folder_id
-        except Exception:
-            pass  # 검증 실패 → 아래 탐색으로 진행
-
-    # 2) 공유드라이브에서 이름으로 대체 탐색(조용히)
-    if not shared_drive_id:
-        raise RuntimeError("shared_drive_id가 비어 있습니다. [google].shared_drive_id를 설정해 주세요.")
-
-    resp = drive.files().list(
-        corpora="drive",
-        driveId=shared_drive_id,
-        q=f"mimeType='application/vnd.google-apps.folder' and name='{folder_name}' and trashed=false",
-        fields="files(id,name)",
-        includeItemsFromAllDrives=True,
-        supportsAllDrives=True,
-        pageSize=5,
-        spaces="drive",
-    ).execute()
-    files = resp.get("files", [])
-    if not files:
-        raise RuntimeError(f"공유드라이브에서 '{folder_name}' 폴더를 찾지 못했습니다.")
-
-    picked = files[0]["id"]
-    st.session_state["resolved_upload_folder_id"] = picked
-    if DEBUG_UPLOAD: st.caption(f"📁 folder picked: {picked}")
-    return picked
-
-
-def upload_to_drive(uploaded_file) -> dict:
-    """Streamlit UploadedFile → Drive 업로드 + (가능하면) 링크공개. 진단/예외 처리 강화."""
-    drive = get_drive_client()
+# ====== 첨부 미리보기 — 검색 결과를 펼쳤을 때만 받아 서버에서 썸네일로 줄여 캐시 ======
+ATTACH_THUMB_PX = 320
+THUMBNAIL_CACHE_MB = float(st.secrets.get("thumbnail_cache_mb", 64))
 
-    # 0) 업로드 폴더 ID 검증 (빈 값/권한 오류를 업로드 전에 잡음)
-    if not DRIVE_UPLOAD_FOLDER_ID:
-        st.error("업로드용 폴더 ID가 비어 있습니다. secrets.toml의 drive_upload_folder_id 또는 [google].uploads_folder_id를 확인해 주세요.")
-        raise RuntimeError("Missing DRIVE_UPLOAD_FOLDER_ID")
-
-    try:
-        target_folder_id = resolve_upload_folder_id(drive)
-    except Exception as e:
-        st.error("업로드 폴더를 확정하지 못해 중단합니다.")
-        raise
-
-# (이 아래부터는 target_folder_id 사용)
-    meta = {
-        "name": uploaded_file.name,
-        "parents": [target_folder_id],
-        # "mimeType": mime,  ← 필요시 주석 해제
-    }
-    # 1) 파일 생성
-    file_bytes = uploaded_file.getvalue()
-    mime = getattr(uploaded_file, "type", None) or "application/octet-stream"
-    media = MediaIoBaseUpload(io.BytesIO(file_bytes), mimetype=mime, resumable=True)
-
-    meta = {
-        "name": uploaded_file.name,
-        "parents": [target_folder_id],
-        # "mimeType": mime,  # 굳이 지정 안 해도 무방 (문제시 주석 해제)
-    }
+@st.cache_resource(show_spinner=False)
+def get_thumbnail_cache() -> ThumbnailCache:
+    return ThumbnailCache(int(THUMBNAIL_CACHE_MB * 1024 * 1024))
 
-    f = drive.files().create(
-        body=meta,
-        media_body=media,
-        fields="id,name,mimeType,webViewLink,iconLink",
-        supportsAllDrives=True,
-    ).execute()
-
-    # 생성 결과 점검 (문제 없으면 주석 처리 가능)
-    # st.write({"created_file": f})
-
-    file_id = f.get("id")
-    if not file_id:
-        st.error("Drive 파일 생성에 실패했습니다. 응답에 id가 없습니다.")
-        raise RuntimeError(f"Drive create() response: {f}")
-
-    # 2) 권한 부여(조직 정책에 따라 실패할 수 있으므로 예외 허용)
-    try:
-        perm_body = None
-        if DRIVE_LINK_SHARING == "anyone":
-            perm_body = {"role": "reader", "type": "anyone"}
-        elif DRIVE_LINK_SHARING == "domain":
-            perm_body = {
-                "role": "reader",
-                "type": "domain",
-                "domain": ORG_DOMAIN_FOR_DRIVE,
-                "allowFileDiscovery": False,
-            }
-        if perm_body:
-            drive.permissions().create(
-                fileId=file_id,
-                body=perm_body,
-                supportsAllDrives=True
-            ).execute()
-    except Exception:
-    # cannotModifyInheritedPermission(403) 등은 그냥 패스
-        pass
-
-    # 3) 반환 메타 구성
-    is_image = (f.get("mimeType", "").startswith("image/"))
-    return {
-        "id": file_id,
-        "name": f.get("name"),
-        "mime": f.get("mimeType"),
-        "view_url": f.get("webViewLink"),  # 새탭 열람
-        "embed_url": _image_embed_url(file_id) if is_image
-                     else (_pdf_preview_url(file_id) if f.get("mimeType") == "application/pdf" else f.get("webViewLink")),
-        "is_image": is_image,
-        "icon": f.get("iconLink"),
-    }
+@st.cache_resource(show_spinner=False)
+def _get_authorized_session():
+    from google.auth.transport.requests import AuthorizedSession
+    return AuthorizedSession(get_credentials())
 
-def get_worksheet():
+def _fetch_preview_source(att: dict):
+    """이미지는 원본 파일, PDF는 Drive가 만든 첫 페이지 썸네일. 그 외 형식은 None."""
+    drive = get_drive_client()
+    mime = att.get("mime") or ""
+    if att.get("is_image") or mime.startswith("image/"):
+        return drive.files().get_media(fileId=att["id"], supportsAllDrives=True).execute(http=thread_drive_http())
+    if mime == "application/pdf":
+        meta = drive.files().get(fileId=att["id"], fields="thumbnailLink", supportsAllDrives=True).execute(http=thread_drive_http())
+        link = meta.get("thumbnailLink")
+        if not link:
+            return None
+        # thumbnailLink 끝의 '=s220'이 크기 → 필요한 만큼만 받기
+        resp = _get_authorized_session().get(re.sub(r"=s\d+$", f"=s{ATTACH_THUMB_PX}", link), timeout=30)
+        resp.raise_for_status()
+        return resp.content
+    return None
+
+def attachment_thumbnail(att: dict) -> bytes:
+    """첨부 하나의 미리보기 WebP (미리보기 불가면 b""). 같은 내용(sha256)이면 한 번만 받음."""
+    def make():
+        data = _fetch_preview_source(att)
+        return make_thumbnail(data, ATTACH_THUMB_PX) if data else b""
+    return get_thumbnail_cache().get(att.get("sha256") or att["id"], make)
+
+def render_attachments(attachments_json):
+    attachments = [a for a in parse_attachments(attachments_json) if a.get("id")]
+    if not attachments:
+        return
+    cols = st.columns(min(len(attachments), 3))
+    with st.spinner("첨부 미리보기 불러오는 중..."):
+        for i, att in enumerate(attachments):
+            with cols[i % len(cols)]:
+                thumb = attachment_thumbnail(att)
+                if thumb:
+                    st.image(thumb)
+                st.markdown(f"[📎 {att.get('name') or '첨부파일'}]({att.get('view_url') or att.get('embed_url')})")
+
+def get_sheet_key() -> str:
     sheet_key = (st.secrets.get("google", {}) or {}).get("qa_sheet_key")
     if not sheet_key:
         st.error("secrets에 [google].qa_sheet_key가 없습니다.")
         st.stop()
+    return sheet_key
+
+@st.cache_resource(show_spinner=False)
+def _open_worksheet(sheet_key: str):
+    # open_by_key 자체가 메타데이터 조회(API 호출)이므로 프로세스당 1회만
+    spreadsheet = get_gspread_client().open_by_key(sheet_key)
+    return spreadsheet.get_worksheet(0)
+
+def get_worksheet():
+    return _open_worksheet(get_sheet_key())
+
+
+# ====== Q&A 스냅샷 (모든 세션이 공유하는 프로세스 캐시, 로직은 qa_core) ======
+SNAPSHOT_TTL_SEC = float(st.secrets.get("snapshot_ttl_sec", 30))
+SNAPSHOT_FULL_RELOAD_SEC = float(st.secrets.get("snapshot_full_reload_sec", 600))  # 외부(시트 직접) 수정 대비
+
+@st.cache_resource(show_spinner=False)
+def get_qa_snapshot(sheet_key: str) -> QASnapshot:
+    return QASnapshot(
+        _open_worksheet(sheet_key),
+        sheet_key,
+        revision_fn=lambda: sheet_revision(get_gspread_client(), sheet_key),
+        ttl_sec=SNAPSHOT_TTL_SEC,
+        full_reload_sec=SNAPSHOT_FULL_RELOAD_SEC,
+        on_warning=st.error,
+    )
+
+
+# ====== 로컬 SQLite 복제본 (선택) — 재시작 직후에도 시트를 기다리지 않고 바로 표시 ======
+REPLICA_PATH = st.secrets.get("local_replica_path", "")  # 예: ".cache/qa_replica.sqlite3", 비우면 사용 안 함
+REPLICA_SYNC_SEC = float(st.secrets.get("replica_sync_sec", SNAPSHOT_TTL_SEC))
+
+@st.cache_resource(show_spinner=False)
+def get_qa_replica(sheet_key: str):
+    if not REPLICA_PATH:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(REPLICA_PATH)), exist_ok=True)
+    replica = SQLiteReplica(REPLICA_PATH)
+    snapshot = get_qa_snapshot(sheet_key)
+    header, rows = replica.load()
+    if header:
+        snapshot.seed(header, rows)
+    replica.attach(snapshot)
+    # 이후 시트 확인은 백그라운드 스레드가 맡고, 화면은 메모리 스냅샷만 읽음
+    start_background_sync(snapshot, REPLICA_SYNC_SEC)
+    return replica
+
+
+# ====== 등록 대기열 — 번호 배정 후 바로 반환, 업로드·시트 기록은 백그라운드에서 ======
+SUBMIT_BATCH_WINDOW_SEC = float(st.secrets.get("submit_batch_window_sec", 0.5))
+
+@st.cache_resource(show_spinner=False)
+def get_submission_queue(sheet_key: str) -> SubmissionQueue:
+    return SubmissionQueue(
+        get_qa_snapshot(sheet_key),
+        upload_fn=get_drive_uploader(sheet_key).upload_many,
+        batch_window_sec=SUBMIT_BATCH_WINDOW_SEC,
+    )
+
+
+# ====== 의미(임베딩) 기반 유사질문 ======
+SEMANTIC_ENABLED = bool(st.secrets.get("semantic_search", True))
+EMBED_MODEL_NAME = st.secrets.get("embedding_model", DEFAULT_EMBED_MODEL)
+EMBED_INCLUDE_ANSWER = bool(st.secrets.get("embedding_include_answer", False))  # True면 '질문 답변'을 함께 인코딩
+EMBED_CACHE_PATH = os.path.join(st.secrets.get("embedding_cache_dir", ".cache"), "qa_embeddings.npz")
+SEMANTIC_PREVIEW_THRESHOLD = 0.75    # 유사질문 미리보기
+SEMANTIC_DUPLICATE_THRESHOLD = 0.92  # 등록 차단(중복) 판정
+
+@st.cache_resource(show_spinner=False)
+def get_embedding_model():
+    return load_sentence_model(EMBED_MODEL_NAME)
+
+@st.cache_resource(show_spinner=False)
+def get_semantic_index() -> SemanticIndex:
+    return SemanticIndex(
+        EMBED_CACHE_PATH,
+        model_name=EMBED_MODEL_NAME,
+        model_loader=get_embedding_model,
+        include_answer=EMBED_INCLUDE_ANSWER,
+    )
+
+def semantic_ready(df: pd.DataFrame) -> bool:
+    """
+    모델 로드·전체 인코딩이 끝났으면 True. 아직이면 백그라운드에서 준비를 시작하고 False
+    → 새 프로세스의 첫 등록이 모델 다운로드/인코딩을 기다리지 않음 (그동안 중복 확인은 문자 기준만).
+    """
+    if not SEMANTIC_ENABLED:
+        return False
+    index = get_semantic_index()
+    if not index.ready:
+        index.warm_in_background(df)
+    return index.ready
+
+def semantic_matches(df: pd.DataFrame, query, k=3, threshold=0.0) -> list:
+    if not SEMANTIC_ENABLED:
+        return []
+    with get_perf_stats().timed("compute", "semantic"):
+        return get_semantic_index().search(df, query, k, threshold)
+
+
+# ====== 입력 중 유사질문 제안 — 스크립트 밖 스레드에서 최신 입력만 계산 ======
+SUGGEST_DEBOUNCE_SEC = float(st.secrets.get("suggest_debounce_sec", 0.3))
+
+def _compute_suggestions(snapshot: QASnapshot, df: pd.DataFrame, question, should_stop) -> list:
+    # 유사질문(65%↑)인 행 3개까지 (색인으로 후보만 비교)
+    index = snapshot.question_index(df)
+    with get_perf_stats().timed("compute", "similar.suggest"):
+        similar_pos = [pos for pos, _ in index.matches(question, 0.65, limit=3, should_stop=should_stop) if pos < len(df)]
+    # 문자 유사 결과가 3개 미만이면 의미가 비슷한 질문으로 채움 (모델 준비 전에는 문자 결과만 바로 보여줌)
+    if len(similar_pos) < 3 and not should_stop() and semantic_ready(df):
+        for pos, _ in semantic_matches(df, question, k=3, threshold=SEMANTIC_PREVIEW_THRESHOLD):
+            if pos not in similar_pos and len(similar_pos) < 3:
+                similar_pos.append(pos)
+    return similar_pos
+
+@st.cache_resource(show_spinner=False)
+def get_similar_suggester(sheet_key: str) -> SimilarSuggester:
+    snapshot = get_qa_snapshot(sheet_key)
+    return SimilarSuggester(
+        lambda df, question, should_stop: _compute_suggestions(snapshot, df, question, should_stop),
+        debounce_sec=SUGGEST_DEBOUNCE_SEC,
+    )
+
 
-    spreadsheet = gc.open_by_key(sheet_key)
-    worksheet = spreadsheet.get_worksheet(0)
-    return worksheet
 # ====== 디자인 및 인삿말 ======
 st.markdown("""
 <style>
@@ -243,7 +380,7 @@ hr { margin-top: 2px !important; margin-bottom: 2px !important; }
 
 
 # ------- 상단 캐릭터+인사말 -------
-char_img = get_character_img_base64("title_image.png")
+char_img = get_character_img("title_image.png")
 
 intro_html = f"""
 <div style="display: flex; align-items: flex-start; gap: 14px; margin-bottom: 1rem;">
@@ -265,21 +402,18 @@ intro_html = f"""
 """
 
 st.markdown(intro_html, unsafe_allow_html=True)# ====== 데이터 불러오기 ======
-worksheet = get_worksheet()
-data = worksheet.get_all_values()
-df = pd.DataFrame(data[1:], columns=data[0])
-# '첨부_JSON' 헤더 자동 보정
-if "첨부_JSON" not in df.columns:
-    try:
-        worksheet.update_cell(1, len(df.columns)+1, "첨부_JSON")
-        data = worksheet.get_all_values()
-        df = pd.DataFrame(data[1:], columns=data[0])  # 헤더 갱신
-    except Exception as e:
-        st.error(f"'첨부_JSON' 헤더 추가 중 오류: {e}")
-
-if "번호" in df.columns:
-    df["번호"] = df["번호"].astype(int)
-else:
+sheet_key = get_sheet_key()
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+current_session.set(st.session_state["session_id"])  # 이 실행에서 나가는 API 호출을 세션별로 집계
+snapshot = get_qa_snapshot(sheet_key)
+replica = get_qa_replica(sheet_key)
+df = snapshot.current() if replica is not None else None
+if df is None:
+    with perf.timed("compute", "snapshot.load"):
+        df = snapshot.load()
+
+if "번호" not in df.columns:
     st.error("시트에 '번호' 컬럼이 없습니다. 시트 구조를 확인하세요.")
 
 # ========== Q&A 등록 폼 ==========
@@ -294,22 +428,45 @@ if st.session_state['reset']:
     st.session_state['input_answer'] = ""
     st.session_state['reset'] = False
 
+# 등록 실패 건의 "입력란으로 되돌리기" → 위젯을 그리기 전에 채워 둠
+restore_fields = st.session_state.pop("restore_fields", None)
+if restore_fields:
+    st.session_state['input_manager'] = restore_fields.get("작성자", "")
+    st.session_state['input_question'] = restore_fields.get("질문", "")
+    st.session_state['input_answer'] = restore_fields.get("답변", "")
+
 st.markdown("### 📋 영업가족 질의응답 등록")
 
 manager_name = st.text_input("🧑‍💼 매니저 이름", placeholder="예: 배서희", key="input_manager")
 question = st.text_area("❓ 질문 내용", placeholder="예: 자동이체 신청은 어떻게 하나요?", key="input_question", height=50)
 
-existing_questions = df["질문"].tolist()
-if question.strip():
-    # 유사질문(70%↑)인 DataFrame의 행 3개까지 뽑기
-    similar_rows = df[
-        df["질문"].apply(lambda q: difflib.SequenceMatcher(None, question.strip(), str(q).strip()).ratio() >= 0.65)
-    ].head(3)
-    if not similar_rows.empty:
-        for _, row in similar_rows.iterrows():
-            st.info(
-                f"⚠️ 유사질문:\n{row['질문']}\n\n💡 등록된 답변:\n{row['답변']}"
-            )
+question_index = snapshot.question_index(df)
+submission_queue = get_submission_queue(sheet_key)
+# ✅ 유사질문 미리보기: 계산은 백그라운드에서, 결과가 나올 때까지 이 부분만 0.5초마다 다시 그림
+suggester = get_similar_suggester(sheet_key)
+
+def _request_suggestions():
+    if not question.strip():
+        return [], True
+    semantic_ready(df)  # 첫 질문 입력 시 의미 검색 모델을 백그라운드에서 준비 (등록 버튼이 기다리지 않도록)
+    return suggester.request(st.session_state["session_id"], df, question)
+
+@st.fragment(run_every=None if _request_suggestions()[1] else 0.5)
+def show_similar_suggestions():
+    similar_pos, ready = _request_suggestions()
+    for _, row in df.iloc[similar_pos or []].iterrows():
+        st.info(
+            f"⚠️ 유사질문:\n{row['질문']}\n\n💡 등록된 답변:\n{row['답변']}"
+        )
+    if not ready:
+        st.caption("유사질문 찾는 중...")
+        st.session_state["suggest_waiting"] = question
+    elif st.session_state.get("suggest_waiting") == question:
+        # 기다리던 결과가 나왔으면 전체를 한 번 다시 그려 주기적 갱신을 멈춤
+        st.session_state["suggest_waiting"] = None
+        st.rerun(scope="app")
+
+show_similar_suggestions()
 answer = st.text_area("💡 답변 내용", placeholder="예: 사장님, 계약>입출금>(공통)결제방법>자동이체 계좌신청에서 ...", key="input_answer", height=50)
 uploaded_files = st.file_uploader(
     "📎 이미지/파일 첨부 (이미지, PDF, Office 문서)",
@@ -324,72 +481,85 @@ if st.button("✅ 시트에 등록하기"):
     if not question.strip() or not answer.strip():
         st.error("⚠ 질문과 답변은 필수 입력입니다. 반드시 내용을 입력해 주세요.")
     else:
-        existing_questions = [q.strip() for q in df["질문"].tolist()]
-        is_near_duplicate = any(
-            difflib.SequenceMatcher(None, question.strip(), q).ratio() >= 0.9
-            for q in existing_questions
+        # 아직 시트에 기록 중인 등록과도 비교 (동시에 같은 질문을 두 번 누른 경우)
+        with perf.timed("compute", "similar.duplicate_check"):
+            is_near_duplicate = bool(question_index.matches(question, 0.9, limit=1)) or is_duplicate_question(
+                question, [t.fields["질문"] for t in submission_queue.pending()], threshold=0.9
+            )
+        semantic_dups = (
+            semantic_matches(df, question, k=3, threshold=SEMANTIC_DUPLICATE_THRESHOLD) if semantic_ready(df) else []
         )
 
-        if question.strip() and is_near_duplicate:
+        if question.strip() and (is_near_duplicate or semantic_dups):
             st.warning("⚠ 매니저님 감사합니다. 그런데 이미 유사한 질문이 등록되어 있네요.")
-            similar_list = sorted(
-                (
-                    (q, difflib.SequenceMatcher(None, question.strip(), q).ratio())
-                    for q in existing_questions
-                ),
-                key=lambda x: x[1],
-                reverse=True
-            )[:3]
+            similar_list = [
+                (question_index.texts[pos], r) for pos, r in question_index.top_k(question, 3)
+            ]
             for q, r in similar_list:
                 st.info(f"• 유사도 {r:.0%} → {q}")
+            listed = {q for q, _ in similar_list}
+            for pos, score in semantic_dups:
+                q = str(df.iloc[pos]["질문"]).strip()
+                if q not in listed:
+                    st.info(f"• 의미 유사도 {score:.0%} → {q}")
 
         else:
-            new_no = 1 if len(df) == 0 else df["번호"].max() + 1
             today = datetime.date.today().strftime("%Y-%m-%d")
+            ticket = submission_queue.submit(
+                {"질문": str(question), "답변": str(answer), "작성자": str(manager_name), "작성일": str(today)},
+                files=uploaded_files,
+            )
+            st.session_state.setdefault("my_submissions", []).append(ticket.id)
+            st.session_state["reset"] = True
+            st.session_state.setdefault("uploader_key", 0)
+            st.session_state["uploader_key"] += 1   # 파일 업로더 비우기
+            st.rerun()
+
+# ✅ 내 등록 현황: 대기 중인 등록이 있으면 2초마다 이 부분만 다시 그림
+def _my_tickets():
+    dismissed = st.session_state.get("dismissed_submissions", set())
+    tickets = [submission_queue.tickets.get(tid) for tid in st.session_state.get("my_submissions", [])]
+    return [t for t in tickets if t is not None and t.id not in dismissed]
+
+@st.fragment(run_every=1 if any(t.status == "pending" for t in _my_tickets()) else None)
+def show_my_submissions():
+    tickets = _my_tickets()
+    for t in tickets:
+        if t.status == "pending":
+            st.info(f"⏳ 등록 접수됨 (번호 {t.no}) — 첨부 업로드·시트 기록 중입니다. 다른 작업을 계속하셔도 됩니다.")
+            if t.file_count and t.attachments is None:
+                st.progress(min(t.upload_progress, 1.0), text=f"첨부 업로드 중... ({t.uploaded_count}/{t.file_count})")
+        elif t.status == "confirmed":
+            st.success(f"✅ 질의응답이 성공적으로 등록되었습니다! (번호 {t.no})")
+        else:
+            # 입력란은 접수 때 이미 비웠으므로, 실패한 내용은 전부 보여 주고 되돌릴 수 있게 남겨 둠
+            st.error(f"❌ 등록 중 에러 발생 — 아래 내용은 시트에 기록되지 않았습니다.\n\n"
+                     f"질문: {t.fields['질문']}\n\n답변: {t.fields['답변']}"
+                     + (f"\n\n첨부파일 {t.file_count}개는 되돌린 뒤 다시 선택해 주세요." if t.file_count else ""))
+            st.exception(t.error)
+            col_restore, col_dismiss = st.columns([1, 1])
+            if col_restore.button("↩️ 입력란으로 되돌리기", key=f"restore_{t.id}"):
+                st.session_state["restore_fields"] = dict(t.fields)
+                st.session_state["dismissed_submissions"] = st.session_state.get("dismissed_submissions", set()) | {t.id}
+                st.rerun(scope="app")
+            if col_dismiss.button("닫기", key=f"dismiss_{t.id}"):
+                st.session_state["dismissed_submissions"] = st.session_state.get("dismissed_submissions", set()) | {t.id}
+                st.rerun(scope="app")
+        for w in t.warnings:
+            st.error(w)
+    # 끝난 건은 전체 화면을 한 번 다시 그려(새 행이 검색·최근 목록에 보이도록) 보여준 뒤 목록에서 뺌
+    # (실패 건은 되돌리기/닫기를 누를 때까지 남김)
+    shown = st.session_state.setdefault("shown_submissions", set())
+    finished = {t.id for t in tickets if t.status != "pending"}
+    st.session_state["my_submissions"] = [
+        t.id for t in tickets if not (t.status == "confirmed" and t.id in shown)
+    ]
+    fresh = finished - shown
+    shown |= finished
+    if fresh:
+        st.rerun(scope="app")
 
-            try:
-                # ✅ (A) 첨부 업로드: 스피너 + 진행률
-                attachments = []
-                if uploaded_files:
-                    total = len(uploaded_files)
-                    with st.spinner(f"이미지/파일 업로드 중입니다... (총 {total}개)"):
-                        prog = st.progress(0)
-                        for idx, uf in enumerate(uploaded_files, start=1):
-                            try:
-                                attachments.append(upload_to_drive(uf))
-                            except Exception as e:
-                                st.error(f"첨부 업로드 실패: {uf.name} — {e}")
-                                st.exception(e)
-                            finally:
-                                prog.progress(idx / total)
-                        prog.empty()  # 진행률 바 제거
-
-                attachments_json = json.dumps(attachments, ensure_ascii=False)
-
-                # ✅ (B) 시트 기록: 스피너
-                with st.spinner("시트에 기록 중..."):
-                    worksheet.append_row(
-                        [
-                            str(new_no),
-                            str(question),
-                            str(answer),
-                            str(manager_name),
-                            str(today),
-                            attachments_json,   # ← 6번째 컬럼: 첨부_JSON
-                        ],
-                        value_input_option="USER_ENTERED"
-                    )
-
-                # ✅ (C) 완료 메시지 + 폼/업로더 초기화
-                st.success("✅ 질의응답이 성공적으로 등록되었습니다!")
-                st.session_state["reset"] = True
-                st.session_state.setdefault("uploader_key", 0)
-                st.session_state["uploader_key"] += 1   # 파일 업로더 비우기
-                st.rerun()
-
-            except Exception as e:
-                st.error("❌ 등록 중 에러 발생")
-                st.exception(e)
+show_my_submissions()
 
 st.markdown("---")
 st.subheader("🔎 Q&A 복합검색(키워드, 작성자) 후 수정·삭제")
@@ -397,28 +567,43 @@ st.subheader("🔎 Q&A 복합검색(키워드, 작성자) 후 수정·삭제")
 search_query = st.text_input("질문/답변 내용 키워드로 검색", "")
 search_writer = st.text_input("작성자 이름으로 검색", "")
 
-filtered_df = df.copy()
-if search_query.strip():
-    filtered_df = filtered_df[
-        filtered_df["질문"].str.contains(search_query, case=False, na=False) |
-        filtered_df["답변"].str.contains(search_query, case=False, na=False)
-    ]
-if search_writer.strip():
-    filtered_df = filtered_df[
-        filtered_df["작성자"].str.contains(search_writer, case=False, na=False)
-    ]
+SEARCH_PAGE_SIZE = 10
 
 edit_num = st.session_state.get("edit_num", None)
 delete_num = st.session_state.get("delete_num", None)
 
 if search_query.strip() or search_writer.strip():
-    if filtered_df.empty:
+    if replica is not None:
+        with perf.timed("compute", "search.replica"):
+            pos_of = {str(no): pos for pos, no in enumerate(df["번호"])}
+            hit_pos = [pos_of[no] for no in replica.search(search_query, search_writer) if no in pos_of]
+    else:
+        with perf.timed("compute", "search.index"):
+            hit_pos = [pos for pos in snapshot.search_index(df).search(search_query, search_writer) if pos < len(df)]
+    # 검색어가 바뀌면 첫 페이지로
+    if st.session_state.get("search_key") != (search_query, search_writer):
+        st.session_state["search_key"] = (search_query, search_writer)
+        st.session_state["search_page"] = 1
+    total_pages = max(1, math.ceil(len(hit_pos) / SEARCH_PAGE_SIZE))
+    page = min(max(1, st.session_state.get("search_page", 1)), total_pages)
+
+    if not hit_pos:
         st.info("검색 결과가 없습니다.")
     else:
-        filtered_df = filtered_df.reset_index(drop=True)
+        st.caption(f"검색 결과 {len(hit_pos)}건 · {page}/{total_pages} 페이지")
+        page_pos = hit_pos[(page - 1) * SEARCH_PAGE_SIZE: page * SEARCH_PAGE_SIZE]
+        # 현재 페이지의 행만 위젯으로 그림
+        filtered_df = df.iloc[page_pos].reset_index(drop=True)
         for idx, row in filtered_df.iterrows():
-            with st.expander(f"질문: {row['질문']} | 작성자: {row['작성자']} | 날짜: {row['작성일']}"):
+            # 펼쳐져 있을 때만 첨부 미리보기를 받도록 열림 상태를 추적
+            expander = st.expander(
+                f"질문: {row['질문']} | 작성자: {row['작성자']} | 날짜: {row['작성일']}",
+                key=f"qa_{row['번호']}", on_change="rerun",
+            )
+            with expander:
                 st.write(f"**답변:** {row['답변']}")
+                if expander.open and "첨부_JSON" in row:
+                    render_attachments(row["첨부_JSON"])
                 col_edit, col_del = st.columns([1, 1])
 
                 # ----------- 수정 -----------
@@ -430,15 +615,14 @@ if search_query.strip() or search_writer.strip():
                         submitted_edit = st.form_submit_button(f"저장_{row['번호']}")
                         if submitted_edit:
                             try:
-                                번호_셀 = worksheet.find(str(row["번호"]))
-                                행번호 = 번호_셀.row
-                                worksheet.update_cell(행번호, 2, str(new_question))
-                                worksheet.update_cell(행번호, 3, str(new_answer))
-                                worksheet.update_cell(행번호, 4, str(new_writer))
+                                snapshot.update_row(row["번호"], {
+                                    "질문": new_question, "답변": new_answer, "작성자": new_writer,
+                                })
                                 st.success("✅ 수정이 완료되었습니다.")
                                 del st.session_state["edit_num"]
                                 st.rerun()
                             except Exception as e:
+                                snapshot.invalidate()
                                 st.error(f"수정 중 에러 발생: {e}")
                 else:
                     if col_edit.button(f"✏️ 수정_{row['번호']}", key=f"edit_{row['번호']}"):
@@ -452,13 +636,12 @@ if search_query.strip() or search_writer.strip():
                     with col_confirm:
                         if st.button(f"진짜 삭제_{row['번호']}", key=f"confirm_del_{row['번호']}"):
                             try:
-                                번호_셀 = worksheet.find(str(row["번호"]))
-                                행번호 = 번호_셀.row
-                                worksheet.delete_rows(행번호)
+                                snapshot.delete_rows([row["번호"]])
                                 st.success("✅ 삭제가 완료되었습니다.")
                                 del st.session_state["delete_num"]
                                 st.rerun()
                             except Exception as e:
+                                snapshot.invalidate()
                                 st.error(f"삭제 중 에러 발생: {e}")
                     with col_cancel:
                         if st.button(f"취소_{row['번호']}", key=f"cancel_del_{row['번호']}"):
@@ -468,12 +651,123 @@ if search_query.strip() or search_writer.strip():
                     if col_del.button(f"🗂️ 삭제_{row['번호']}", key=f"del_{row['번호']}"):
                         st.session_state["delete_num"] = row["번호"]
                         st.rerun()
+
+        if total_pages > 1:
+            col_prev, col_next = st.columns([1, 1])
+            if col_prev.button("◀ 이전", key="search_prev", disabled=page <= 1):
+                st.session_state["search_page"] = page - 1
+                st.rerun()
+            if col_next.button("다음 ▶", key="search_next", disabled=page >= total_pages):
+                st.session_state["search_page"] = page + 1
+                st.rerun()
 else:
     st.info("검색 조건(질문/답변 키워드 또는 작성자 이름)을 입력하시면 결과가 표시됩니다.")
 
+# ========== 일괄 등록(CSV/XLSX) · 내보내기 ==========
+def _export_csv():
+    # 다운로드 버튼을 눌렀을 때만 별도 스레드에서 만듦. 스냅샷 행을 조금씩 써 넣어 버퍼 하나만 사용
+    buf = io.BytesIO()
+    for chunk in iter_csv_chunks(snapshot):
+        buf.write(chunk)
+    buf.seek(0)
+    return buf
+
+def _export_xlsx():
+    buf = write_xlsx(snapshot, io.BytesIO())
+    buf.seek(0)
+    return buf
+
+with st.expander("📦 Q&A 일괄 등록(CSV/XLSX) · 내보내기"):
+    st.caption("첫 행에 '질문', '답변' 헤더가 필요합니다 (선택: '작성자', '작성일', '첨부_JSON'). 번호는 자동으로 매기고, 이미 등록된 질문과 유사한 행은 건너뜁니다.")
+    bulk_file = st.file_uploader(
+        "CSV 또는 XLSX 파일", type=["csv", "xlsx"], key=f"bulk_{st.session_state.get('bulk_key', 0)}",
+    )
+    if bulk_file is not None and st.button("📥 일괄 등록 시작"):
+        prog = st.progress(0.0, text="읽는 중...")
+
+        def bulk_progress(done, added, skipped):
+            frac = min(bulk_file.tell() / max(bulk_file.size, 1), 1.0)  # 읽은 바이트 기준 대략적인 진행률
+            prog.progress(frac, text=f"{done}행 처리 · {added}건 등록 · {skipped}건 제외")
+
+        try:
+            with perf.timed("compute", "bulk_import"):
+                result = bulk_import(
+                    snapshot,
+                    iter_records(bulk_file, bulk_file.name),
+                    allocate_numbers=submission_queue.allocate_many,
+                    semantic_best=get_semantic_index().best_matches if SEMANTIC_ENABLED else None,
+                    semantic_threshold=SEMANTIC_DUPLICATE_THRESHOLD,
+                    on_progress=bulk_progress,
+                )
+            prog.empty()
+            st.success(f"✅ {result['added']}건 등록 · {len(result['skipped'])}건 중복으로 제외 · {len(result['invalid'])}건 형식 오류")
+            report = [{"줄": line, "질문": q, "사유": why} for line, q, why in result["skipped"]]
+            report += [{"줄": line, "질문": "", "사유": why} for line, why in result["invalid"]]
+            if report:
+                st.dataframe(pd.DataFrame(sorted(report, key=lambda r: r["줄"])[:500]), hide_index=True)
+            st.session_state["bulk_key"] = st.session_state.get("bulk_key", 0) + 1  # 다음 실행에서 업로더 비우기
+        except ValueError as e:  # 헤더 누락 등
+            prog.empty()
+            st.error(f"⚠ {e}")
+        except ImportError:
+            prog.empty()
+            st.error("XLSX 파일을 읽으려면 서버에 openpyxl이 설치되어 있어야 합니다. CSV로 저장해서 올려 주세요.")
+        except Exception as e:
+            snapshot.invalidate()
+            st.error("❌ 일괄 등록 중 에러 발생 (에러 전까지의 행은 등록되었습니다)")
+            st.exception(e)
+
+    today = datetime.date.today().strftime("%Y%m%d")
+    col_csv, col_xlsx = st.columns([1, 1])
+    col_csv.download_button(
+        "📤 CSV로 내보내기", data=_export_csv, file_name=f"QA_{today}.csv", mime="text/csv", on_click="ignore",
+    )
+    has_openpyxl = importlib.util.find_spec("openpyxl") is not None
+    col_xlsx.download_button(
+        "📤 XLSX로 내보내기", data=_export_xlsx, file_name=f"QA_{today}.xlsx", on_click="ignore",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        disabled=not has_openpyxl, help=None if has_openpyxl else "서버에 openpyxl이 없어 CSV만 가능합니다.",
+    )
+
 st.markdown("#### 🗂️ 최근 5개 질문 미리보기")
 if not df.empty and "작성자" in df.columns and "질문" in df.columns:
     for idx, row in df[["작성자", "질문"]].tail(5).iterrows():
         st.markdown(f"- **{row['작성자']}**: {row['질문']}")
 else:
     st.info("최근 질문 데이터가 없습니다. (컬럼명 또는 데이터 확인 필요)")
+
+# ====== 시작 시간 측정 (콜드 스타트 회귀 추적용) ======
+@st.cache_resource(show_spinner=False)
+def _get_startup_metrics() -> dict:
+    return {"process_started": time.time(), "cold_import_ms": None, "cold_run_ms": None, "last_run_ms": None}
+
+def _record_startup():
+    metrics = _get_startup_metrics()
+    run_ms = (time.perf_counter() - _SCRIPT_STARTED) * 1000
+    metrics["last_run_ms"] = run_ms
+    if metrics["cold_run_ms"] is None:
+        # 프로세스의 첫 실행 = 콜드 스타트 (import + 클라이언트 생성 + 첫 적재 + 첫 렌더)
+        metrics["cold_import_ms"] = (_IMPORTS_DONE - _SCRIPT_STARTED) * 1000
+        metrics["cold_run_ms"] = run_ms
+        log.info("cold start: imports %.0f ms, first run %.0f ms", metrics["cold_import_ms"], run_ms)
+    perf.record("render", "rerun", run_ms)
+
+# ====== 성능 계측 패널 (관리자용, secrets의 perf_panel = true 일 때만) ======
+if PERF_PANEL:
+    with st.expander("⏱️ 성능 계측 (관리자)"):
+        metrics = _get_startup_metrics()
+        if metrics["cold_run_ms"] is not None:
+            st.caption(
+                f"콜드 스타트 {metrics['cold_run_ms']:.0f} ms (import {metrics['cold_import_ms']:.0f} ms)"
+                f" · 직전 실행 {metrics['last_run_ms']:.0f} ms"
+            )
+        st.markdown("**호출별 소요 시간** (시트/Drive API, 유사도·검색, 화면 렌더)")
+        st.dataframe(pd.DataFrame(perf.summary()), hide_index=True)
+        st.markdown("**분당 API 호출 수** (최근 10분)")
+        st.dataframe(pd.DataFrame([
+            {"분": datetime.datetime.fromtimestamp(minute * 60).strftime("%H:%M"), **counts}
+            for minute, counts in perf.quota_by_minute(10)
+        ]), hide_index=True)
+        st.caption(f"이 세션의 API 호출 수: {perf.session_usage(st.session_state['session_id']) or '없음'}")
+
+_record_startup()
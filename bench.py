@@ -0,0 +1,270 @@
+"""
+오프라인 성능 측정 — 가짜 시트/Drive(qa_fakes)로 qa_core 주요 경로를 1천/1만/10만 행에서 돌려 봄.
+네트워크·실제 시트 없이 돌아가므로 변경 전후 비교(회귀 확인)에 사용.
+
+실행: python bench.py                       # 1000, 10000, 100000행
+      python bench.py --sizes 1000 --latency-ms 50 --quota-rate 0.02 --out bench_output.txt
+의미(임베딩) 검색은 모델 다운로드가 필요해 제외.
+"""
+import argparse
+import gc
+import importlib.util
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from qa_core import DriveUploader, QASnapshot, SubmissionQueue
+from qa_fakes import FakeDrive, FakeWorksheet
+from qa_replica import SQLiteReplica
+
+HEADER = ["번호", "질문", "답변", "작성자", "작성일", "첨부_JSON"]
+
+# ====== 한국어 Q&A 데이터 생성 ======
+_TOPICS = ["자동이체", "보험료 납입", "계약 해지", "해지 환급금", "보험금 청구", "실손 청구", "약관 대출",
+           "주소 변경", "연락처 변경", "수익자 변경", "계약자 변경", "만기 환급금", "갱신 보험료", "특약 추가",
+           "계약 부활", "감액 완납", "카드 납부", "모바일 앱 인증", "진단서 발급", "청약 철회"]
+_ASKS = ["{t} 신청은 어떻게 하나요?", "{t} 시 필요한 서류가 뭔가요?", "{t} 처리 기간은 얼마나 걸리나요?",
+         "고객이 {t} 문의하면 어디서 확인하나요?", "{t} 가능한 시간이 정해져 있나요?", "{t} 취소도 되나요?",
+         "법인 계약도 {t} 되나요?", "{t} 후 문자 안내가 가나요?"]
+_MENUS = ["계약", "입출금", "고객", "청구", "변경", "조회", "서류"]
+_SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+_GIVEN = ["서희", "민준", "지우", "서연", "하준", "도윤", "수아", "예준", "지호", "은비", "현우", "다은"]
+
+
+def make_rows(n: int, seed=0) -> list:
+    rnd = random.Random(seed)
+    rows = []
+    for no in range(1, n + 1):
+        topic = rnd.choice(_TOPICS)
+        question = rnd.choice(_ASKS).format(t=topic)
+        if rnd.random() < 0.3:  # 같은 질문이라도 현장마다 조금씩 다르게 씀
+            question = question.replace(" ", "", 1) + rnd.choice(["", " 급해요", " (고객 문의)", " 확인 부탁드립니다"])
+        menu = ">".join(rnd.sample(_MENUS, 3))
+        answer = f"사장님, {menu}에서 {topic} 메뉴로 들어가시면 됩니다. 처리까지 {rnd.randint(1, 5)}영업일 걸립니다."
+        writer = rnd.choice(_SURNAMES) + rnd.choice(_GIVEN)
+        date = f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        attachments = ""
+        if rnd.random() < 0.1:
+            attachments = json.dumps([{"id": f"old{no}", "name": "화면.png", "sha256": f"{no:064x}"}])
+        rows.append([str(no), question, answer, writer, date, attachments])
+    return rows
+
+
+def make_queries(rows: list, k: int, seed=1) -> list:
+    """기존 질문을 조금 바꾼 것 절반 + 새 질문 절반."""
+    rnd = random.Random(seed)
+    queries = []
+    for i in range(k):
+        if i % 2 == 0:
+            queries.append(rnd.choice(rows)[1].replace("?", "").strip() + " 알려주세요")
+        else:
+            queries.append(f"{rnd.choice(_TOPICS)} {rnd.choice(['문의', '방법', '관련'])} {rnd.choice(_GIVEN)}")
+    return queries
+
+
+# ====== 측정 ======
+class Bench:
+    def __init__(self, size: int, *, trace_memory: bool):
+        self.size = size
+        self.trace_memory = trace_memory
+        self.results = []  # (size, op, calls, avg_ms, p95_ms, peak_kb)
+
+    def run(self, op: str, fn, repeat=1, setup=None):
+        """fn()을 repeat번 재서 평균/p95. trace_memory면 한 번 더 돌려 tracemalloc 최대 사용량도."""
+        times, error = [], None
+        for _ in range(repeat):
+            try:
+                if setup:
+                    setup()
+                started = time.perf_counter()
+                fn()
+            except Exception as e:  # 쿼터 오류 주입 시 등 (준비 단계 포함) — 기록만 하고 다음 항목으로
+                error = e
+                break
+            times.append((time.perf_counter() - started) * 1000)
+        peak_kb = None
+        if self.trace_memory and error is None:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                if setup:
+                    setup()
+                    tracemalloc.reset_peak()  # 준비 단계는 빼고 fn()만
+                fn()
+                peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+            except Exception as e:
+                error = e
+            finally:
+                tracemalloc.stop()
+        if times:
+            p95 = sorted(times)[min(len(times) - 1, int(len(times) * 0.95))]
+            self.results.append((self.size, op, len(times), statistics.fmean(times), p95, peak_kb, error))
+        else:
+            self.results.append((self.size, op, 0, None, None, None, error))
+
+
+def _bench_http_factory():
+    """app.new_drive_http와 같은 연결(AuthorizedHttp) 생성 비용까지 포함 — 가짜 Drive는 이 연결로 실제 통신하지 않음."""
+    if importlib.util.find_spec("google_auth_httplib2") is None:
+        return lambda: None
+    import google_auth_httplib2
+    import httplib2
+    from google.auth.credentials import AnonymousCredentials
+    return lambda: google_auth_httplib2.AuthorizedHttp(AnonymousCredentials(), http=httplib2.Http(timeout=300))
+
+
+def _upload(uploader: DriveUploader, files: list):
+    attachments, errors = uploader.upload_many(files)
+    if errors:
+        raise errors[0][1]  # 쿼터 오류 주입 시 등 — Bench.run이 기록
+    return attachments
+
+
+def bench_size(n: int, args) -> list:
+    latency = args.latency_ms / 1000
+    rows = make_rows(n)
+    queries = make_queries(rows, args.queries)
+    b = Bench(n, trace_memory=not args.no_memory)
+
+    ws = FakeWorksheet([HEADER] + rows, latency_sec=latency, quota_error_rate=args.quota_rate, seed=n)
+    holder = {}
+
+    def new_snapshot():
+        holder["snap"] = QASnapshot(ws, "bench", revision_fn=ws.get_revision, ttl_sec=0, full_reload_sec=3600)
+
+    # 스냅샷 적재
+    b.run("snapshot.load(full)", lambda: holder["snap"].load(), setup=new_snapshot)
+    snap = holder["snap"]
+    b.run("snapshot.load(unchanged)", snap.load, repeat=20)
+
+    def external_append():
+        no = len(ws.values)
+        ws.append_rows([[str(10 ** 7 + no), "외부에서 추가된 질문", "답", "관리자", "2024-12-31", ""]])
+    b.run("snapshot.load(appended)", snap.load, repeat=5, setup=external_append)
+    df = snap.load()
+    b.results.append((n, f"  (df 메모리 {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB)", 0, None, None, None, None))
+
+    # 유사질문
+    qindex = snap.question_index(df)
+    it = iter(queries * 10)
+    b.run("similar.preview(0.65,3)", lambda: qindex.matches(next(it), 0.65, limit=3), repeat=len(queries))
+    b.run("similar.duplicate(0.9)", lambda: qindex.matches(next(it), 0.9, limit=1), repeat=len(queries))
+    b.run("similar.top_k(3)", lambda: qindex.top_k(next(it), 3), repeat=len(queries))
+
+    # 복합검색
+    def reset_search_index():
+        snap.sindex = None
+    b.run("search.build", lambda: snap.search_index(df), setup=reset_search_index)
+    terms = iter([("자동이체", ""), ("보험금 청구", ""), ("", "김서희"), ("서류", "이"), ("해지환급금", "")] * 100)
+    b.run("search.query", lambda: snap.search_index(df).search(*next(terms)), repeat=len(queries))
+
+    # 로컬 복제본
+    with tempfile.TemporaryDirectory() as tmp:
+        replica = SQLiteReplica(os.path.join(tmp, "bench.sqlite3"))
+        b.run("replica.sync(initial)", lambda: replica.sync(snap.header, snap.rows))
+        b.run("replica.sync(unchanged)", lambda: replica.sync(snap.header, snap.rows))
+        terms = iter([("자동이체", ""), ("보험금 청구", ""), ("", "김서희"), ("서류", "이"), ("해지환급금", "")] * 100)
+        b.run("replica.search", lambda: replica.search(*next(terms)), repeat=len(queries))
+
+    # 수정/삭제 (번호 → 행 찾기 + 요청 1회 + 캐시 반영)
+    rnd = random.Random(n)
+    targets = iter(rnd.sample(range(1, n + 1), min(n, 40)))
+    b.run("row.find", lambda: snap.find_row(rnd.randint(1, n)), repeat=len(queries))
+    b.run("row.update", lambda: snap.update_row(next(targets), {"답변": "수정된 답변"}), repeat=10)
+    b.run("row.delete", lambda: snap.delete_rows([next(targets)]), repeat=5)
+
+    # 등록 대기열: 동시에 들어온 20건 → 번호 배정 + append 묶음
+    queue = SubmissionQueue(snap, batch_window_sec=0.01)
+    queue.QUOTA_RETRY_SEC = 1  # 실제는 분당 쿼터 회복 대기(60초)
+
+    def submit_burst():
+        tickets = [queue.submit({"질문": q, "답변": "답", "작성자": "벤치", "작성일": "2024-12-31"})
+                   for q in queries[:20]]
+        while any(t.status == "pending" for t in tickets):
+            time.sleep(0.002)
+    b.run("submit.queue(20건)", submit_burst, repeat=3)
+
+    # 첨부 업로드: 새 파일 4개 + 이미 올린 파일 재사용 4개
+    if n == args.sizes[0]:
+        if importlib.util.find_spec("googleapiclient") is None:
+            b.results.append((n, "upload (googleapiclient 없음 — 건너뜀)", 0, None, None, None, None))
+        else:
+            drive = FakeDrive(latency_sec=latency, quota_error_rate=args.quota_rate, seed=n)
+            folder_id = next(iter(drive.files_by_id))
+            payloads = [os.urandom(args.upload_kb * 1024) for _ in range(4)]
+
+            def files():
+                out = []
+                for i, data in enumerate(payloads):
+                    f = io.BytesIO(data)
+                    f.name, f.type, f.size = f"첨부{i}.png", "image/png", len(data)
+                    out.append(f)
+                return out
+
+            def new_uploader(find_existing=None):
+                # app.get_drive_uploader와 같은 경로 (폴더 확정 캐시, 해시 재사용, 파일별 연결, 권한 batch)
+                return DriveUploader(drive, http_factory=_bench_http_factory(), folder_id=folder_id,
+                                     find_existing=find_existing, max_workers=4)
+
+            def fresh_uploader():
+                holder["uploader"] = new_uploader()  # 업로드 기록 없음 → 매번 실제 전송
+
+            dedup = new_uploader(snap.attachment_by_hash)
+            b.run(f"upload(4×{args.upload_kb}KB)", lambda: _upload(holder["uploader"], files()),
+                  repeat=3, setup=fresh_uploader)
+            b.run(f"upload.dedup_miss(4×{args.upload_kb}KB)", lambda: _upload(dedup, files()))  # 처음 한 번은 실제 업로드
+            b.run(f"upload.dedup_hit(4×{args.upload_kb}KB)", lambda: _upload(dedup, files()), repeat=3)
+
+    b.results.append((n, f"  (시트 호출 {ws.faults.calls}회, 쿼터 오류 {ws.faults.quota_errors}회)",
+                      0, None, None, None, None))
+    return b.results
+
+
+def format_results(results: list) -> str:
+    lines = [f"{'행 수':>8}  {'작업':<32}{'횟수':>6}{'평균 ms':>12}{'p95 ms':>12}{'최대 메모리 KB':>16}"]
+    for size, op, calls, avg, p95, peak, error in results:
+        if avg is None and error is None:
+            lines.append(f"{size:>8}  {op}")
+            continue
+        cols = f"{size:>8}  {op:<32}{calls:>6}"
+        cols += f"{avg:>12.2f}{p95:>12.2f}" if avg is not None else f"{'-':>12}{'-':>12}"
+        cols += f"{peak:>16.0f}" if peak is not None else f"{'-':>16}"
+        if error is not None:
+            cols += f"  ! {type(error).__name__}: {error}"
+        lines.append(cols)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Q&A 오프라인 성능 측정")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=50, help="유사질문/검색 측정용 질의 수")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="가짜 시트/Drive 호출당 지연")
+    parser.add_argument("--quota-rate", type=float, default=0.0, help="호출이 429로 실패할 확률")
+    parser.add_argument("--upload-kb", type=int, default=512)
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 측정 생략 (빠름)")
+    parser.add_argument("--out", help="결과를 이 파일에도 기록 (예: bench_output.txt)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n in args.sizes:
+        started = time.perf_counter()
+        results += bench_size(n, args)
+        print(f"[{n}행] {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    report = format_results(results) + f"\n\n최대 RSS {rss_mb:.0f} MB · Python {sys.version.split()[0]}"
+    print(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Q&A 일괄 등록(CSV/XLSX) · 내보내기 — Streamlit 없이 import 가능 (app.py, server.py가 함께 사용)
+- 등록: 파일을 chunk_size행씩 읽어 → 등록 폼과 같은 중복 확인(색인/임베딩 일괄) → 번호 일괄 배정 → chunk마다 append 1회
+- 내보내기: 스냅샷 행을 그대로 조금씩 직렬화 (DataFrame으로 한 번 더 복사하지 않음), 첨부_JSON 포함
+XLSX는 openpyxl(read_only / write_only 모드)이 있을 때만.
+"""
+import csv
+import datetime
+import io
+import itertools
+
+from qa_core import QASnapshot, QuestionIndex
+
+EXPORT_COLUMNS = ["번호", "질문", "답변", "작성자", "작성일", "첨부_JSON"]
+IMPORT_REQUIRED = ("질문", "답변")
+DUPLICATE_THRESHOLD = 0.9  # 등록 폼의 중복 판정과 같은 값
+_SNIFF_BYTES = 64 * 1024
+
+
+# ====== 읽기 (스트리밍) ======
+def _guess_encoding(fileobj) -> str:
+    # 엑셀에서 저장한 한글 CSV는 cp949인 경우가 많음 → 앞부분만 보고 판단
+    head = fileobj.read(_SNIFF_BYTES)
+    fileobj.seek(0)
+    for cut in range(4):  # 끝에서 잘린 멀티바이트 문자 허용
+        try:
+            head[:len(head) - cut].decode("utf-8")
+            return "utf-8-sig"
+        except UnicodeDecodeError:
+            continue
+    return "cp949"
+
+def _iter_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding=_guess_encoding(fileobj), newline="")
+    try:
+        reader = csv.reader(text)
+        header = next(reader, [])
+        yield [str(h).strip() for h in header]
+        yield from reader
+    finally:
+        text.detach()  # 업로드 버퍼는 호출한 쪽 소유
+
+def _iter_xlsx(fileobj):
+    from openpyxl import load_workbook
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        yield ["" if h is None else str(h).strip() for h in header]
+        for row in rows:
+            yield ["" if v is None else (v.strftime("%Y-%m-%d") if isinstance(v, datetime.date) else str(v))
+                   for v in row]
+    finally:
+        wb.close()
+
+def iter_records(fileobj, filename: str):
+    """업로드 파일 → (줄 번호, {컬럼명: 값}) 를 한 행씩. 첫 행은 헤더."""
+    rows = _iter_xlsx(fileobj) if filename.lower().endswith((".xlsx", ".xlsm")) else _iter_csv(fileobj)
+    header = next(rows, [])
+    missing = [c for c in IMPORT_REQUIRED if c not in header]
+    if missing:
+        raise ValueError(f"필수 컬럼이 없습니다: {', '.join(missing)} (첫 행에 헤더가 필요합니다)")
+    for line_no, row in enumerate(rows, start=2):
+        if not any(str(v).strip() for v in row):
+            continue  # 빈 줄
+        yield line_no, {h: str(v).strip() for h, v in zip(header, row) if h}
+
+
+def chunked(iterable, size: int):
+    it = iter(iterable)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+# ====== 일괄 등록 ======
+def bulk_import(snapshot: QASnapshot, records, *, allocate_numbers, semantic_best=None,
+                semantic_threshold=None, chunk_size=500, on_progress=None) -> dict:
+    """
+    records: iter_records()의 (줄 번호, dict) 반복자
+    allocate_numbers(n) → 번호 n개 (등록 대기열과 같은 배정기)
+    semantic_best(df, 질문 list) → [(pos, 점수) | None, ...] — 주면 semantic_threshold 이상도 중복 처리
+    반환: {"added": n, "skipped": [(줄, 질문, 사유)], "invalid": [(줄, 사유)]}
+    """
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    added, skipped, invalid = 0, [], []
+    accepted = QuestionIndex()  # 이번 파일 안에서 이미 받은 질문 (파일 내 중복)
+    processed = 0
+    for chunk in chunked(records, chunk_size):
+        df = snapshot.load()
+        existing = snapshot.question_index(df)
+        candidates = []
+        for line_no, rec in chunk:
+            question, answer = rec.get("질문", ""), rec.get("답변", "")
+            if not question or not answer:
+                invalid.append((line_no, "질문/답변이 비어 있음"))
+            elif existing.matches(question, DUPLICATE_THRESHOLD, limit=1):
+                skipped.append((line_no, question, "이미 등록된 질문과 유사"))
+            else:
+                candidates.append((line_no, rec))
+
+        if candidates and semantic_best is not None and len(df):
+            best = semantic_best(df, [rec["질문"] for _, rec in candidates])
+            kept = []
+            for (line_no, rec), hit in zip(candidates, best):
+                if hit is not None and hit[1] >= semantic_threshold:
+                    skipped.append((line_no, rec["질문"], f"의미 유사도 {hit[1]:.0%}"))
+                else:
+                    kept.append((line_no, rec))
+            candidates = kept
+
+        # 파일 안 중복은 시트·의미 확인을 통과한 행끼리만 — 걸러진 행 때문에 뒤 행이 빠지지 않도록
+        kept = []
+        for line_no, rec in candidates:
+            if accepted.matches(rec["질문"], DUPLICATE_THRESHOLD, limit=1):
+                skipped.append((line_no, rec["질문"], "파일 안에서 중복"))
+            else:
+                kept.append((line_no, rec))
+                accepted.add_many([rec["질문"]])
+        candidates = kept
+
+        if candidates:
+            numbers = allocate_numbers(len(candidates))
+            header = snapshot.header or EXPORT_COLUMNS
+            rows = []
+            for no, (_, rec) in zip(numbers, candidates):
+                values = {"작성일": today, "첨부_JSON": "", **rec, "번호": str(no)}
+                rows.append([str(values.get(col, "")) for col in header])
+            snapshot.append_rows(rows)  # chunk당 요청 1회 (쿼터 초과는 qa_core에서 재시도)
+            added += len(rows)
+
+        processed += len(chunk)
+        if on_progress:
+            on_progress(processed, added, len(skipped) + len(invalid))
+    return {"added": added, "skipped": skipped, "invalid": invalid}
+
+
+# ====== 내보내기 (스트리밍) ======
+def _export_rows(snapshot: QASnapshot):
+    # 바깥 list만 얕게 복사 → 내보내는 동안 다른 세션이 행을 추가/삭제해도 안전, 행 자체는 복사 안 함
+    with snapshot.lock:
+        header, rows = list(snapshot.header), list(snapshot.rows)
+    cols = [header.index(c) if c in header else None for c in EXPORT_COLUMNS]
+    for row in rows:
+        yield [row[i] if i is not None else "" for i in cols]
+
+def iter_csv_chunks(snapshot: QASnapshot, chunk_rows=1000):
+    """CSV(UTF-8 BOM, 엑셀에서 한글이 깨지지 않게)를 chunk_rows행씩 bytes로."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunked(_export_rows(snapshot), chunk_rows):
+        writer.writerows(chunk)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+def write_xlsx(snapshot: QASnapshot, fileobj):
+    """openpyxl write_only 모드로 한 행씩 기록 (전체 시트를 메모리에 만들지 않음)."""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Q&A")
+    ws.append(EXPORT_COLUMNS)
+    for row in _export_rows(snapshot):
+        ws.append(row)
+    wb.save(fileobj)
+    return fileobj
@@ -0,0 +1,1523 @@
+"""
+매니저 Q&A 공용 로직 — Streamlit 없이 import 가능 (app.py, server.py가 함께 사용)
+- 시트 스냅샷(프로세스 캐시) + 번호→행 색인
+- 유사질문(문자/의미) · 복합검색 색인
+- 시트 쓰기(요청 묶기 + 쿼터 초과 시 재시도) · 등록 대기열
+- 첨부 업로드(Drive, 중복 확인 SHA-256) · 미리보기 썸네일 캐시
+"""
+import contextlib
+import contextvars
+import difflib
+import functools
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import gspread
+import numpy as np
+import pandas as pd
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import rowcol_to_a1
+
+log = logging.getLogger(__name__)
+
+
+# ====== 유사질문(문자) 색인 ======
+class QuestionIndex:
+    """
+    질문 음절(문자) 역색인 — 유사질문 후보를 먼저 좁히고 후보만 SequenceMatcher로 정확히 계산.
+    ratio() = 2*M/(len_a+len_b) 이고 M ≤ 두 문자열의 공통 문자 개수이므로,
+    공통 문자 수로 구한 상한이 임계값 미만인 질문은 건너뛰어도 결과가 전과 완전히 같음.
+    위치(pos)는 스냅샷 df의 행 위치와 같음.
+    """
+
+    def __init__(self, questions=()):
+        self._lock = threading.Lock()
+        self.texts = []      # strip 된 질문
+        self.postings = {}   # 문자 → {pos: 개수}
+        self.add_many(questions)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add_many(self, questions):
+        with self._lock:
+            for q in questions:
+                pos = len(self.texts)
+                text = str(q).strip()
+                self.texts.append(text)
+                for ch, cnt in Counter(text).items():
+                    self.postings.setdefault(ch, {})[pos] = cnt
+
+    def _upper_bounds(self, query: str) -> dict:
+        """공통 문자가 하나라도 있는 질문들의 ratio 상한 {pos: bound}."""
+        overlap = {}
+        with self._lock:
+            for ch, q_cnt in Counter(query).items():
+                for pos, cnt in self.postings.get(ch, {}).items():
+                    overlap[pos] = overlap.get(pos, 0) + min(q_cnt, cnt)
+            lengths = {pos: len(self.texts[pos]) for pos in overlap}
+        q_len = len(query)
+        return {pos: 2.0 * m / (q_len + lengths[pos]) for pos, m in overlap.items()}
+
+    def _ratio(self, query: str, pos: int) -> float:
+        return difflib.SequenceMatcher(None, query, self.texts[pos]).ratio()
+
+    def matches(self, query, threshold: float, limit=None, *, should_stop=None) -> list:
+        """
+        ratio ≥ threshold 인 (pos, ratio)를 시트 순서대로 최대 limit개.
+        should_stop(): 주기적으로 확인해 True면 SuggestionCancelled (입력 중 제안 계산 취소용)
+        """
+        query = str(query).strip()
+        if not query:
+            candidates = range(len(self.texts))
+        else:
+            bounds = self._upper_bounds(query)
+            candidates = sorted(pos for pos, b in bounds.items() if b >= threshold)
+        found = []
+        for i, pos in enumerate(candidates):
+            if should_stop is not None and i % 64 == 0 and should_stop():
+                raise SuggestionCancelled(query)
+            r = self._ratio(query, pos)
+            if r >= threshold:
+                found.append((pos, r))
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def top_k(self, query, k=3) -> list:
+        """ratio 내림차순(동률이면 시트 순서) 상위 k개 (pos, ratio)."""
+        query = str(query).strip()
+        if not query:
+            scored = [(pos, self._ratio(query, pos)) for pos in range(len(self.texts))]
+            return sorted(scored, key=lambda x: (-x[1], x[0]))[:k]
+        bounds = self._upper_bounds(query)
+        scored = []
+        for pos, bound in sorted(bounds.items(), key=lambda x: (-x[1], x[0])):
+            if len(scored) >= k and bound < scored[k - 1][1]:
+                break  # 남은 후보는 상한조차 현재 k번째보다 낮음
+            scored.append((pos, self._ratio(query, pos)))
+            scored = sorted(scored, key=lambda x: (-x[1], x[0]))[:k]
+        best = [x for x in scored[:k] if x[1] > 0]
+        if len(best) < k:
+            # 공통 문자가 없는 질문은 ratio 0 → 기존처럼 시트 순서로 채움
+            taken = {pos for pos, _ in best}
+            zeros = (pos for pos in range(len(self.texts)) if pos not in taken)
+            for pos in zeros:
+                if len(best) >= k:
+                    break
+                best.append((pos, 0.0))
+        return best
+
+
+class SuggestionCancelled(Exception):
+    """더 새 입력이 들어와 계산할 필요가 없어진 유사질문 제안."""
+
+
+class SimilarSuggester:
+    """
+    입력 중인 질문의 유사질문 제안을 스크립트 스레드 밖에서 계산.
+    - 세션마다 가장 최근 질문 하나만 계산: debounce_sec 안에 새 입력이 오면 이전 것은 시작도 안 하고
+      (대기는 타이머로 — 작업 스레드를 잡고 있지 않음), 계산 중이었으면 중단(should_stop)
+    - 결과는 (df, 질문) 기준 LRU 캐시 — 세션마다 보고 있는 df가 달라도 서로의 결과를 지우지 않음.
+      아직 계산 전이면 같은 df에서 캐시된 가장 긴 앞부분 질문의 결과를 임시로 보여줌
+    compute(df, 질문, should_stop) → 결과 (작업 스레드에서 호출)
+    """
+
+    MAX_FRAMES = 4  # 캐시에 결과를 남겨 두는 df(스냅샷 시점) 수 — 넘으면 가장 오래된 df의 결과부터 버림
+
+    def __init__(self, compute, *, debounce_sec=0.3, cache_size=512, max_workers=2):
+        from concurrent.futures import ThreadPoolExecutor
+        self.compute = compute
+        self.debounce_sec = debounce_sec
+        self.cache_size = cache_size
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qa-suggest")
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()   # (id(df), 질문) → 결과
+        self._frames = OrderedDict()  # id(df) → df (캐시에 결과가 있는 df — 참조를 쥐고 있어 id가 재사용되지 않음)
+        self._latest = {}             # 세션 id → 대기/진행 중인 작업 dict
+
+    def _touch_frame(self, df):
+        # lock 안에서 호출
+        key = id(df)
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            return
+        self._frames[key] = df
+        while len(self._frames) > self.MAX_FRAMES:
+            old, _ = self._frames.popitem(last=False)
+            for k in [k for k in self._cache if k[0] == old]:
+                del self._cache[k]
+
+    def request(self, session_id, df, query):
+        """반환: (결과, 확정 여부). 확정 전이면 결과는 앞부분 질문의 캐시(없으면 None)."""
+        query = str(query).strip()
+        frame = id(df)
+        with self._lock:
+            if self._frames.get(frame) is df and (frame, query) in self._cache:
+                self._cache.move_to_end((frame, query))
+                return self._cache[(frame, query)], True
+            job = self._latest.get(session_id)
+            if job is None or job["query"] != query or job["df"] is not df:
+                if job is not None:
+                    self._cancel(job)
+                job = {"session": session_id, "query": query, "df": df, "cancelled": False, "future": None}
+                job["timer"] = threading.Timer(self.debounce_sec, self._start, (job,))
+                job["timer"].daemon = True
+                self._latest[session_id] = job
+                job["timer"].start()
+            prefix = None
+            if self._frames.get(frame) is df:
+                prefix = max((q for f, q in self._cache if f == frame and query.startswith(q)), key=len, default=None)
+            return (self._cache[(frame, prefix)] if prefix is not None else None), False
+
+    @staticmethod
+    def _cancel(job):
+        job["cancelled"] = True
+        job["timer"].cancel()
+        if job["future"] is not None:
+            job["future"].cancel()
+
+    def _start(self, job):
+        # 디바운스가 끝난 작업만 작업 스레드로
+        with self._lock:
+            if not job["cancelled"]:
+                job["future"] = self._pool.submit(self._run, job)
+
+    def _run(self, job):
+        if job["cancelled"]:
+            return
+        try:
+            result = self.compute(job["df"], job["query"], lambda: job["cancelled"])
+        except SuggestionCancelled:
+            return
+        except Exception:
+            log.exception("유사질문 제안 계산 실패")
+            result = []
+        with self._lock:
+            self._touch_frame(job["df"])
+            self._cache[(id(job["df"]), job["query"])] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            if self._latest.get(job["session"]) is job:
+                del self._latest[job["session"]]
+
+
+def is_duplicate_question(new_question, existing_questions, threshold=0.85):
+    index = existing_questions if isinstance(existing_questions, QuestionIndex) else QuestionIndex(existing_questions)
+    return bool(index.matches(new_question, threshold, limit=1))  # QuestionIndex.matches와 같은 기준(유사도 ≥ threshold)
+
+# ====== 복합검색 색인 ======
+def normalize_for_search(text) -> str:
+    # 대소문자·띄어쓰기 무시 ("자동 이체" == "자동이체")
+    return "".join(str(text).lower().split())
+
+def _bigrams(text: str) -> list:
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+class SearchIndex:
+    """
+    질문/답변/작성자 역색인 (띄어쓰기를 지운 음절 bigram) + BM25 순위.
+    검색어는 공백으로 나눈 단어가 모두 들어 있어야(AND) 결과에 포함 — bigram으로 후보를 좁힌 뒤 부분문자열로 확인.
+    """
+
+    FIELD_WEIGHTS = {"질문": 2.0, "답변": 1.0, "작성자": 1.0}
+    K1, B = 1.2, 0.75
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self.size = 0
+        self.texts = {f: [] for f in self.FIELD_WEIGHTS}      # 정규화된 필드 값
+        self.postings = {f: {} for f in self.FIELD_WEIGHTS}   # bigram → {pos: tf}
+        self.total_len = {f: 0 for f in self.FIELD_WEIGHTS}
+        self.add_many(records)
+
+    def __len__(self):
+        return self.size
+
+    def add_many(self, records):
+        with self._lock:
+            for rec in records:
+                pos = self.size
+                for field in self.FIELD_WEIGHTS:
+                    text = normalize_for_search(rec.get(field, ""))
+                    self.texts[field].append(text)
+                    grams = _bigrams(text)
+                    self.total_len[field] += len(grams)
+                    postings = self.postings[field]
+                    for gram, tf in Counter(grams).items():
+                        postings.setdefault(gram, {})[pos] = tf
+                self.size += 1
+
+    def _term_docs(self, term: str, field: str) -> set:
+        texts = self.texts[field]
+        if len(term) < 2:
+            return {pos for pos, text in enumerate(texts) if term in text}
+        lists = sorted((self.postings[field].get(g, {}) for g in set(_bigrams(term))), key=len)
+        docs = set(lists[0])
+        for other in lists[1:]:
+            docs.intersection_update(other)
+            if not docs:
+                break
+        return {pos for pos in docs if term in texts[pos]}
+
+    def _bm25(self, pos: int, grams: set, fields) -> float:
+        score = 0.0
+        for field in fields:
+            postings = self.postings[field]
+            dl = max(len(self.texts[field][pos]) - 1, 0)
+            avgdl = (self.total_len[field] / self.size) or 1.0
+            norm = self.K1 * (1 - self.B + self.B * dl / avgdl)
+            for gram in grams:
+                docs = postings.get(gram)
+                tf = docs.get(pos) if docs else None
+                if not tf:
+                    continue
+                idf = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+                score += self.FIELD_WEIGHTS[field] * idf * tf * (self.K1 + 1) / (tf + norm)
+        return score
+
+    def search(self, query="", writer="") -> list:
+        """
+        query: 질문·답변 키워드(공백 구분 AND), writer: 작성자 키워드.
+        반환: pos 목록 — 키워드가 있으면 BM25 점수순(동점은 시트 순서), 작성자만 있으면 시트 순서.
+        """
+        terms = [normalize_for_search(t) for t in str(query).split()]
+        writer_terms = [normalize_for_search(t) for t in str(writer).split()]
+        text_fields = ("질문", "답변")
+        with self._lock:
+            matched = None
+            for term in terms:
+                docs = set().union(*(self._term_docs(term, f) for f in text_fields))
+                matched = docs if matched is None else matched & docs
+                if not matched:
+                    return []
+            for term in writer_terms:
+                docs = self._term_docs(term, "작성자")
+                matched = docs if matched is None else matched & docs
+                if not matched:
+                    return []
+            if matched is None:
+                return []
+            if not terms:
+                return sorted(matched)
+            grams = {g for t in terms for g in (_bigrams(t) or [t])}
+            scored = [(pos, self._bm25(pos, grams, text_fields)) for pos in matched]
+        return [pos for pos, _ in sorted(scored, key=lambda x: (-x[1], x[0]))]
+
+
+# ====== 시트 쓰기 (요청 묶기 + 쿼터 초과 시 재시도) ======
+# 셀 하나하나 update_cell 하면 요청마다 분당 쓰기 쿼터를 소모하므로, 한 번의 요청으로 묶어서 보냄.
+WRITE_MAX_RETRIES = 5
+_RETRYABLE_STATUS = (429, 500, 502, 503)
+
+def _with_backoff(call, *args, idempotent=True, **kwargs):
+    """429(쿼터 초과)는 항상, 5xx는 멱등 요청일 때만 지수 백오프로 재시도."""
+    for attempt in range(WRITE_MAX_RETRIES):
+        try:
+            return call(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            retryable = status == 429 or (idempotent and status in _RETRYABLE_STATUS)
+            if not retryable or attempt == WRITE_MAX_RETRIES - 1:
+                raise
+            time.sleep(min(2 ** attempt, 32) + random.random())
+
+def write_cells(worksheet, cells: dict):
+    """{(행, 열): 값} 을 values.batchUpdate 한 번으로 기록. 같은 행의 연속된 열은 한 범위로 합침."""
+    data = []
+    for (row, col), value in sorted(cells.items()):
+        last = data[-1] if data else None
+        if last and last["_row"] == row and last["_end"] == col - 1:
+            last["values"][0].append(str(value))
+            last["_end"] = col
+        else:
+            data.append({"_row": row, "_start": col, "_end": col, "values": [[str(value)]]})
+    ranges = [
+        {"range": f"{rowcol_to_a1(d['_row'], d['_start'])}:{rowcol_to_a1(d['_row'], d['_end'])}",
+         "values": d["values"]}
+        for d in data
+    ]
+    if ranges:
+        _with_backoff(worksheet.batch_update, ranges, value_input_option="USER_ENTERED")
+
+def append_qa_rows(worksheet, rows: list):
+    """여러 행을 append 한 번으로 (일괄 등록용). 중복 기록을 막기 위해 5xx는 재시도하지 않음."""
+    if rows:
+        _with_backoff(worksheet.append_rows, rows, value_input_option="USER_ENTERED", idempotent=False)
+
+def delete_sheet_rows(worksheet, row_numbers):
+    """여러 행을 batchUpdate 한 번으로 삭제. 연속 구간은 합치고 아래쪽부터 지워 행 번호가 밀리지 않게 함."""
+    spans = []
+    for row in sorted(set(row_numbers), reverse=True):
+        if spans and spans[-1][0] == row + 1:
+            spans[-1][0] = row
+        else:
+            spans.append([row, row])
+    requests = [
+        {"deleteDimension": {"range": {
+            "sheetId": worksheet.id, "dimension": "ROWS",
+            "startIndex": start - 1, "endIndex": end,
+        }}}
+        for start, end in spans
+    ]
+    if requests:
+        _with_backoff(worksheet.spreadsheet.batch_update, {"requests": requests}, idempotent=False)
+
+
+# ====== Q&A 스냅샷 (프로세스 공용 캐시) ======
+# - TTL 안에서는 네트워크 호출 없이 캐시된 df를 그대로 사용
+# - TTL이 지나면 시트 revision(Drive version)만 확인 → 같으면 그대로 연장
+# - 바뀌었으면 '번호' 열만 받아 뒤에 추가된 행만 가져오고, 그 외 변경은 전체 재적재
+# - 이 객체를 통해 한 추가/수정/삭제는 캐시에 바로 반영
+def _pad_rows(values, width: int) -> list:
+    # Sheets API는 행 끝의 빈 셀을 잘라서 주므로 헤더 폭에 맞춰 채움
+    return [(list(r) + [""] * width)[:width] for r in values]
+
+def build_qa_frame(header, rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=header)
+    if "번호" in df.columns:
+        df["번호"] = df["번호"].astype(int)
+    return df
+
+def sheet_revision(gc, sheet_key: str):
+    """
+    시트 파일의 Drive version(시트가 바뀔 때마다 증가). 조회 실패 시 None (→ 전체 재적재로 처리).
+    gspread 클라이언트의 세션(keep-alive)으로 Drive REST를 직접 호출 → googleapiclient 불필요.
+    """
+    try:
+        resp = gc.request(
+            "get", f"{DRIVE_FILES_API_V3_URL}/{sheet_key}",
+            params={"fields": "version", "supportsAllDrives": "true"},
+        )
+        return resp.json().get("version")
+    except Exception:
+        return None
+
+def file_sha256(fileobj) -> str:
+    """업로드 파일(BytesIO 등) 내용의 SHA-256. 읽은 뒤 위치는 처음으로 되돌림."""
+    fileobj.seek(0)
+    digest = hashlib.file_digest(fileobj, "sha256").hexdigest()
+    fileobj.seek(0)
+    return digest
+
+def parse_attachments(text) -> list:
+    """첨부_JSON 문자열 → 첨부 메타 list (비었거나 깨졌으면 [])."""
+    try:
+        items = json.loads(text) if str(text).strip() else []
+    except ValueError:
+        return []
+    return [a for a in items if isinstance(a, dict)] if isinstance(items, list) else []
+
+def qa_record(row) -> dict:
+    """df 한 행 → API/내보내기용 dict (첨부_JSON은 list로 풀어서)."""
+    rec = {k: (int(v) if k == "번호" else str(v)) for k, v in dict(row).items() if k != "첨부_JSON"}
+    try:
+        rec["첨부"] = json.loads(row.get("첨부_JSON") or "[]")
+    except (TypeError, ValueError):
+        rec["첨부"] = []
+    return rec
+
+
+def _index_attachments(aindex: dict, header, rows):
+    """첨부 SHA-256 → 첨부 메타. 같은 내용이면 먼저 올린 파일 기준."""
+    if "첨부_JSON" not in header:
+        return
+    col = header.index("첨부_JSON")
+    for r in rows:
+        for a in parse_attachments(r[col]):
+            if a.get("sha256") and a.get("id"):
+                aindex.setdefault(a["sha256"], a)
+
+
+class QASnapshot:
+    """
+    시트 한 장의 공유 스냅샷. load()가 돌려주는 df는 여러 세션/요청이 함께 보므로 제자리 수정 금지.
+    revision_fn: 인자 없이 시트 revision을 돌려주는 함수 (None이면 매번 전체 재적재)
+    on_warning: 사용자에게 보여줄 경고 메시지 콜백 (Streamlit이면 st.error)
+    """
+
+    def __init__(self, worksheet, sheet_key: str, *, revision_fn=None,
+                 ttl_sec=30.0, full_reload_sec=600.0, on_warning=None):
+        self.worksheet = worksheet
+        self.sheet_key = sheet_key
+        self.revision_fn = revision_fn or (lambda: None)
+        self.ttl_sec = ttl_sec
+        self.full_reload_sec = full_reload_sec   # 외부(시트 직접) 수정 대비
+        self.on_warning = on_warning or (lambda msg: None)
+        self.lock = threading.RLock()        # 상태 읽기/교체용 (짧게만 잡음)
+        self._load_lock = threading.RLock()  # 시트 적재·캐시 수정은 한 번에 하나씩
+        self.header = []
+        self.rows = []         # 시트 2행부터의 원본 값 (list[list[str]])
+        self.df = None
+        self.row_of = {}       # 번호(str) → 시트 행 번호
+        self.qindex = None
+        self.sindex = None     # 복합검색 색인은 처음 검색할 때 만듦
+        self.aindex = None     # 첨부 SHA-256 → 첨부 메타 (처음 조회할 때 만듦)
+        self.revision = None
+        self.checked_at = 0.0  # 마지막 최신성 확인 시각 (monotonic)
+        self.loaded_at = 0.0   # 마지막 전체 적재 시각 (monotonic)
+        self.listeners = []    # 행이 바뀔 때마다 listener(snapshot) 호출 (lock 밖에서)
+
+    # ---------- 읽기 ----------
+    # 시트 I/O와 df·색인 생성은 self.lock 밖에서 하고, 다 만든 뒤 lock 안에서 한 번에 교체.
+    # 그동안 다른 세션/요청은 이전 스냅샷을 그대로 봄. 적재·캐시 수정끼리는 _load_lock으로 한 번에 하나씩.
+    def _install(self, header, rows, *, start=0, revision=None, full_reload=False):
+        """새 rows로 df·색인을 만들어 교체. start>0이면 앞 start행은 그대로이고 뒤에 추가만 된 것 → 색인은 이어 붙이기만."""
+        with self.lock:
+            qindex, sindex, aindex, row_of = self.qindex, self.sindex, self.aindex, self.row_of
+        df = build_qa_frame(header, rows)
+        questions = df["질문"] if "질문" in df.columns else []
+        if start and qindex is not None:
+            # 색인은 제자리에 이어 붙임 (이전 df를 보는 쪽은 pos < len(df)인 결과만 씀)
+            qindex.add_many(questions[start:])
+            if sindex is not None:
+                sindex.add_many(df.iloc[start:].to_dict("records"))
+            if aindex is not None:
+                _index_attachments(aindex, header, rows[start:])
+            row_of = dict(row_of)
+        else:
+            start = 0
+            qindex, sindex, aindex, row_of = QuestionIndex(questions), None, None, {}
+        # 번호 → 시트 행 번호 (헤더가 1행이므로 pos+2). 번호가 겹치면 위쪽 행 우선
+        if "번호" in header:
+            no_col = header.index("번호")
+            for pos in range(start, len(rows)):
+                row_of.setdefault(rows[pos][no_col], pos + 2)
+        now = time.monotonic()
+        with self.lock:
+            self.header, self.rows, self.df = header, rows, df
+            self.qindex, self.sindex, self.aindex, self.row_of = qindex, sindex, aindex, row_of
+            self.revision = revision
+            self.checked_at = now
+            if full_reload:
+                self.loaded_at = now
+        for listener in list(self.listeners):
+            try:
+                listener(self)
+            except Exception:
+                log.exception("스냅샷 변경 알림 처리 실패")
+
+    def _fetch_all_rows(self):
+        data = self.worksheet.get_all_values()
+        header = data[0] if data else []
+        # '첨부_JSON' 헤더 자동 보정
+        if "첨부_JSON" not in header:
+            try:
+                write_cells(self.worksheet, {(1, len(header) + 1): "첨부_JSON"})
+                data = self.worksheet.get_all_values()
+                header = data[0]  # 헤더 갱신
+            except Exception as e:
+                self.on_warning(f"'첨부_JSON' 헤더 추가 중 오류: {e}")
+        return header, _pad_rows(data[1:], len(header))
+
+    def _fetch_new_rows(self, header, rows):
+        """기존 행은 그대로이고 뒤에 행만 추가된 경우에만 새 행들을 돌려줌. 아니면 None."""
+        if "번호" not in header:
+            return None
+        no_col = header.index("번호")
+        sheet_nos = self.worksheet.col_values(no_col + 1)[1:]
+        known_nos = [r[no_col] for r in rows]
+        if len(sheet_nos) <= len(known_nos) or sheet_nos[:len(known_nos)] != known_nos:
+            return None  # 수정/삭제/중간 삽입 → 전체 재적재
+        first_row = len(known_nos) + 2
+        last_cell = rowcol_to_a1(len(sheet_nos) + 1, len(header))
+        return _pad_rows(self.worksheet.get(f"A{first_row}:{last_cell}"), len(header))
+
+    def _is_fresh(self, force) -> bool:
+        return self.df is not None and not force and time.monotonic() - self.checked_at < self.ttl_sec
+
+    def load(self, *, force=False) -> pd.DataFrame:
+        """TTL 안이면 캐시 그대로, 지났으면 revision 확인 후 필요한 만큼만 새로 읽음."""
+        with self.lock:
+            if self._is_fresh(force):
+                return self.df
+        requested = time.monotonic()
+        with self._load_lock:
+            with self.lock:
+                # 기다리는 동안 다른 스레드가 이미 최신화했으면 그대로 사용
+                if self._is_fresh(force) or (force and self.loaded_at >= requested):
+                    return self.df
+                header, rows, known_revision = self.header, self.rows, self.revision
+                full = force or self.df is None or time.monotonic() - self.loaded_at >= self.full_reload_sec
+
+            # revision은 적재 전에 읽어 둬야 적재 중 생긴 변경을 다음 확인에서 놓치지 않음
+            revision = self.revision_fn()
+            if not full and revision is not None and revision == known_revision:
+                with self.lock:
+                    self.checked_at = time.monotonic()
+                    return self.df
+
+            new_rows = None if full or revision is None else self._fetch_new_rows(header, rows)
+            if new_rows is not None:
+                self._install(header, rows + new_rows, start=len(rows), revision=revision)
+            else:
+                header, rows = self._fetch_all_rows()
+                self._install(header, rows, revision=revision, full_reload=True)
+            return self.df
+
+    def add_listener(self, listener):
+        with self.lock:
+            self.listeners.append(listener)
+
+    def seed(self, header, rows):
+        """시트를 읽기 전에 다른 곳(로컬 복제본 등)의 데이터로 먼저 채움. 다음 load()는 시트 전체 재적재."""
+        with self._load_lock:
+            if self.df is not None:
+                return
+            header = list(header)
+            self._install(header, _pad_rows(rows, len(header)))
+            with self.lock:
+                self.loaded_at = 0.0
+                self.checked_at = 0.0
+
+    def current(self):
+        """네트워크 없이 지금 가진 df (아직 한 번도 안 읽었으면 None). 백그라운드 갱신용 서버에서 사용."""
+        return self.df
+
+    def invalidate(self, *, full=True):
+        """다음 load()에서 다시 확인(full=True면 전체 재적재)하도록 표시."""
+        with self.lock:
+            self.checked_at = 0.0
+            if full:
+                self.loaded_at = 0.0
+
+    def question_index(self, df: pd.DataFrame) -> QuestionIndex:
+        """df와 같은 시점의 질문 색인. (그 사이 스냅샷이 바뀌었으면 df로 새로 만듦)"""
+        with self.lock:
+            if self.df is df and self.qindex is not None:
+                return self.qindex
+        return QuestionIndex(df["질문"] if "질문" in df.columns else [])
+
+    def search_index(self, df: pd.DataFrame) -> SearchIndex:
+        """df와 같은 시점의 복합검색 색인 (스냅샷당 한 번 만들고 행 추가 시 이어 붙임). 만드는 동안 lock은 잡지 않음."""
+        with self.lock:
+            if self.df is df and self.sindex is not None:
+                return self.sindex
+        sindex = SearchIndex(df.to_dict("records"))
+        with self.lock:
+            if self.df is df:
+                if self.sindex is None:
+                    self.sindex = sindex
+                return self.sindex
+        return sindex
+
+    def attachment_by_hash(self, sha256: str):
+        """이미 어느 Q&A에 첨부된 같은 내용의 파일 메타 (없으면 None). 재업로드 없이 id/링크 재사용용."""
+        with self.lock:
+            aindex, df, header, rows = self.aindex, self.df, self.header, self.rows
+        if aindex is None:
+            aindex = {}
+            _index_attachments(aindex, header, rows)
+            with self.lock:
+                if self.df is df and self.aindex is None:
+                    self.aindex = aindex
+        return aindex.get(sha256)
+
+    def find_rows(self, nos) -> list:
+        """
+        번호들 → 시트 행 번호들 (수정/삭제 직전용). TTL과 상관없이 revision을 한 번 확인해(Drive 메타 조회 1회)
+        시트가 직접 바뀌었으면 먼저 최신화한 뒤 색인으로 찾고, 찾은 행의 '번호' 칸을 한 번 읽어 맞는지 확인.
+        색인에 없거나 칸이 다르면(revision이 늦게 반영된 경우) '번호' 열 하나만 읽어 다시 찾음.
+        (색인이 뒤처진 채로 쓰면 다른 행을 덮어쓰거나 지우게 됨)
+        """
+        self.invalidate(full=False)
+        self.load()
+        with self.lock:
+            found = {str(no): self.row_of.get(str(no)) for no in nos}
+            header = self.header
+        no_col = header.index("번호") + 1 if "번호" in header else 1
+        if any(row is None for row in found.values()) or not self._rows_hold(no_col, found):
+            sheet_nos = self.worksheet.col_values(no_col)
+            for no in found:
+                try:
+                    found[no] = sheet_nos.index(no, 1) + 1
+                except ValueError:
+                    raise LookupError(f"시트에서 번호 {no}를 찾지 못했습니다.")
+            # 색인이 시트보다 뒤처져 있음 → 행이 밀렸을 수 있으므로 쓰기 전에 전체 재적재
+            # (표시만 해 두면 이어지는 after_*가 캐시를 고치며 확인 시각을 갱신해 표시가 묻힘)
+            self.load(force=True)
+        return [found[str(no)] for no in nos]
+
+    def _rows_hold(self, no_col: int, found: dict) -> bool:
+        """found의 행들에 정말 그 번호가 있는지 '번호' 칸만 읽어 확인 (values.get 한 번)."""
+        first, last = min(found.values()), max(found.values())
+        cells = self.worksheet.get(f"{rowcol_to_a1(first, no_col)}:{rowcol_to_a1(last, no_col)}")
+        sheet_nos = [r[0] if r else "" for r in cells]
+        return all(row - first < len(sheet_nos) and sheet_nos[row - first] == no for no, row in found.items())
+
+    def find_row(self, no) -> int:
+        """번호 → 시트 행 번호 (find_rows 참고)."""
+        return self.find_rows([no])[0]
+
+    def get(self, no):
+        """번호 → df 한 행(Series). 네트워크 호출 없음. 없으면 None."""
+        with self.lock:
+            df, row = self.df, self.row_of.get(str(no))
+        if df is None or row is None or row - 2 >= len(df):
+            return None
+        return df.iloc[row - 2]
+
+    # ---------- 쓰기 (시트 기록 + 캐시 반영) ----------
+    def _apply_mutation(self, patch, *, appended=False, base_revision=None):
+        # 캐시를 직접 고친 뒤 revision을 새로 받아 두면, 우리 변경 때문에 전체 재적재할 일이 없음
+        # base_revision: 쓰기 직전에 읽은 revision. 캐시의 revision과 다르면 그 사이 시트가 직접 바뀐 것
+        # → 이후 revision을 받아 두면 그 변경까지 반영된 것처럼 묻히므로, 캐시만 고치고 전체 재적재 표시
+        revision = self.revision_fn()  # 우리 쓰기 직후의 revision (네트워크라 lock 밖에서)
+        with self._load_lock:
+            with self.lock:
+                if self.df is None:
+                    return
+                stale = base_revision is not None and base_revision != self.revision
+                header, rows = self.header, list(self.rows)  # 새 목록에 고침 → 이전 rows를 보는 쪽은 그대로
+            try:
+                patch(header, rows)
+            except (ValueError, IndexError, KeyError):
+                self.invalidate()
+                return
+            self._install(header, rows, start=len(self.rows) if appended else 0,
+                          revision=None if stale else revision)
+            if stale:
+                self.invalidate()
+
+    @staticmethod
+    def _row_pos(header, rows, no) -> int:
+        no_col = header.index("번호")
+        for pos, r in enumerate(rows):
+            if r[no_col] == str(no):
+                return pos
+        raise KeyError(no)
+
+    def after_append(self, rows: list, *, base_revision=None):
+        """rows: 시트에 덧붙인 행들 (list[list]). base_revision: 쓰기 직전 revision (_apply_mutation 참고)"""
+        def patch(header, cur):
+            new = _pad_rows(rows, len(header))
+            if "번호" in header:
+                # 기록과 캐시 반영 사이에 다른 스레드의 적재가 이미 받아 왔으면 다시 붙이지 않음
+                no_col = header.index("번호")
+                known = {r[no_col] for r in cur[-len(new):]} if new else set()
+                new = [r for r in new if r[no_col] not in known]
+            cur.extend(new)
+        self._apply_mutation(patch, appended=True, base_revision=base_revision)
+
+    def after_update(self, no, updates: dict, *, base_revision=None):
+        """updates: {컬럼명: 새 값}"""
+        def patch(header, cur):
+            pos = self._row_pos(header, cur, no)
+            row = list(cur[pos])
+            for col_name, value in updates.items():
+                row[header.index(col_name)] = str(value)
+            cur[pos] = row
+        self._apply_mutation(patch, base_revision=base_revision)
+
+    def after_delete(self, nos: list, *, base_revision=None):
+        def patch(header, cur):
+            for no in nos:
+                del cur[self._row_pos(header, cur, no)]
+        self._apply_mutation(patch, base_revision=base_revision)
+
+    def append_rows(self, rows: list):
+        """여러 행을 append 요청 한 번으로 기록하고 캐시에 반영."""
+        base_revision = self.revision_fn()
+        append_qa_rows(self.worksheet, rows)
+        self.after_append(rows, base_revision=base_revision)
+
+    def update_row(self, no, updates: dict):
+        """{컬럼명: 값} 수정을 요청 한 번으로 기록하고 캐시에 반영."""
+        row = self.find_row(no)
+        base_revision = self.revision_fn()
+        write_cells(self.worksheet, {(row, self.header.index(col) + 1): value for col, value in updates.items()})
+        self.after_update(no, updates, base_revision=base_revision)
+
+    def delete_rows(self, nos: list):
+        """번호 여러 개를 요청 한 번으로 삭제하고 캐시에 반영."""
+        rows = self.find_rows(nos)
+        base_revision = self.revision_fn()
+        delete_sheet_rows(self.worksheet, rows)
+        self.after_delete(nos, base_revision=base_revision)
+
+
+# ====== 첨부 업로드 (Drive) ======
+def _image_embed_url(file_id: str) -> str:
+    return f"https://drive.google.com/uc?export=view&id={file_id}"
+
+def _pdf_preview_url(file_id: str) -> str:
+    return f"https://drive.google.com/file/d/{file_id}/preview"
+
+def attachment_meta(f: dict, sha256=None) -> dict:
+    """Drive files.create 응답 → 첨부_JSON에 넣는 첨부 메타."""
+    file_id = f.get("id")
+    is_image = (f.get("mimeType", "").startswith("image/"))
+    return {
+        "id": file_id,
+        "name": f.get("name"),
+        "mime": f.get("mimeType"),
+        "view_url": f.get("webViewLink"),  # 새탭 열람
+        "embed_url": _image_embed_url(file_id) if is_image
+                     else (_pdf_preview_url(file_id) if f.get("mimeType") == "application/pdf" else f.get("webViewLink")),
+        "is_image": is_image,
+        "icon": f.get("iconLink"),
+        "sha256": sha256,  # 같은 내용의 파일을 다시 올리지 않기 위한 키
+    }
+
+def _reuse_attachment(meta: dict, uploaded_file) -> dict:
+    # id/view_url/embed_url은 그대로, 표시 이름만 이번 파일 이름으로
+    return dict(meta, name=uploaded_file.name)
+
+def is_folder_error(e) -> bool:
+    """업로드 폴더가 지워졌거나 권한이 바뀐 경우(403/404)."""
+    from googleapiclient.errors import HttpError
+    return isinstance(e, HttpError) and getattr(e.resp, "status", None) in (403, 404)
+
+
+class DriveUploader:
+    """
+    첨부 업로드 경로 — Streamlit 없이 (app.py의 등록 대기열 작업 스레드와 bench.py가 같은 코드를 씀)
+    - 같은 내용(SHA-256)이면 전송 없이 이미 올린 Drive 파일 재사용 (find_existing + 이 프로세스의 업로드 기록,
+      재사용 전 files.get으로 아직 있는지 확인)
+    - 새 파일은 스레드 풀에서 파일마다 별도 연결로 resumable 업로드, 권한은 batch 요청 한 번으로
+    - 업로드 폴더 확정 결과는 TTL 동안 캐시 (못 찾은 결과도 잠시 기억)
+    drive: googleapiclient Drive v3 서비스
+    http_factory(): 새 연결 — httplib2는 스레드 안전하지 않으므로 작업마다 따로 만들어 씀 (None이면 drive 기본 http)
+    find_existing(sha256): 시트에 이미 기록된 같은 내용의 첨부 메타 (없으면 None)
+    on_progress/경고는 st.* 없이 콜백·예외로만 알림
+    """
+
+    CHUNK_SIZE = 5 * 1024 * 1024  # resumable 청크(256KB 배수) — 청크마다 진행률 갱신
+
+    def __init__(self, drive, *, http_factory=None, folder_id="", shared_drive_id="", folder_name="업로드용",
+                 link_sharing="anyone", org_domain="", find_existing=None, max_workers=4,
+                 folder_cache_ttl_sec=3600.0, folder_negative_ttl_sec=60.0, perf=None):
+        self.drive = drive
+        self.http_factory = http_factory or (lambda: None)
+        self.folder_id = folder_id
+        self.shared_drive_id = shared_drive_id
+        self.folder_name = folder_name
+        self.link_sharing = link_sharing      # "anyone" | "domain" | 그 외(공유 안 함)
+        self.org_domain = org_domain
+        self.find_existing = find_existing or (lambda sha256: None)
+        self.max_workers = max(1, max_workers)
+        self.folder_cache_ttl_sec = folder_cache_ttl_sec
+        self.folder_negative_ttl_sec = folder_negative_ttl_sec
+        self.perf = perf
+        self.uploaded_by_hash = {}  # 이 프로세스에서 올렸지만 아직 시트에 기록되지 않았을 수 있는 첨부
+        self._folder_lock = threading.Lock()
+        self._folder = {"folder_id": None, "expires": 0.0, "error": None, "error_expires": 0.0}
+
+    # ---------- 업로드 폴더 ----------
+    def invalidate_folder(self):
+        """업로드가 404/403으로 실패하면 호출 → 다음 업로드 때 폴더를 다시 확정."""
+        with self._folder_lock:
+            self._folder.update(folder_id=None, expires=0.0, error=None, error_expires=0.0)
+
+    def resolve_folder(self, *, http=None, force_search=False) -> str:
+        """
+        확정된 폴더ID를 캐시(TTL)에서 재사용 → 정상 경로는 추가 API 호출 0회.
+        캐시가 없거나 만료되면 _lookup_folder로 새로 확정.
+        """
+        cache = self._folder
+        with self._folder_lock:
+            now = time.monotonic()
+            if not force_search:
+                if cache["folder_id"] and now < cache["expires"]:
+                    log.debug("📁 folder cached: %s", cache["folder_id"])
+                    return cache["folder_id"]
+                if cache["error"] and now < cache["error_expires"]:
+                    raise RuntimeError(cache["error"])
+            try:
+                folder_id = self._lookup_folder(http=http, force_search=force_search)
+            except Exception as e:
+                cache.update(folder_id=None, error=str(e), error_expires=time.monotonic() + self.folder_negative_ttl_sec)
+                raise
+            cache.update(folder_id=folder_id, expires=time.monotonic() + self.folder_cache_ttl_sec, error=None)
+            return folder_id
+
+    def _lookup_folder(self, *, http=None, force_search=False) -> str:
+        """
+        1) 설정된 폴더ID가 유효하면 그대로 사용(무로그)
+        2) 아니면 공유드라이브에서 '업로드용'(또는 지정명) 폴더를 조용히 찾아 대체
+        """
+        # 1) ID가 있고 강제탐색이 아니면 유효성 검증(조용히)
+        if self.folder_id and not force_search:
+            try:
+                self.drive.files().get(fileId=self.folder_id, supportsAllDrives=True, fields="id").execute(http=http)
+                log.debug("📁 folder ok: %s", self.folder_id)
+                return self.folder_id
+            except Exception:
+                pass  # 검증 실패 → 아래 탐색으로 진행
+
+        # 2) 공유드라이브에서 이름으로 대체 탐색(조용히)
+        if not self.shared_drive_id:
+            raise RuntimeError("shared_drive_id가 비어 있습니다. [google].shared_drive_id를 설정해 주세요.")
+
+        resp = self.drive.files().list(
+            corpora="drive",
+            driveId=self.shared_drive_id,
+            q=f"mimeType='application/vnd.google-apps.folder' and name='{self.folder_name}' and trashed=false",
+            fields="files(id,name)",
+            includeItemsFromAllDrives=True,
+            supportsAllDrives=True,
+            pageSize=5,
+            spaces="drive",
+        ).execute(http=http)
+        files = resp.get("files", [])
+        if not files:
+            raise RuntimeError(f"공유드라이브에서 '{self.folder_name}' 폴더를 찾지 못했습니다.")
+
+        picked = files[0]["id"]
+        log.debug("📁 folder picked: %s", picked)
+        return picked
+
+    def _ensure_folder(self, *, http=None) -> str:
+        # 빈 값/권한 오류를 업로드 전에 잡음. 메시지는 예외로 → 등록 상태의 경고로 표시됨
+        if not self.folder_id:
+            raise RuntimeError("업로드용 폴더 ID가 비어 있습니다. secrets.toml의 drive_upload_folder_id 또는 [google].uploads_folder_id를 확인해 주세요.")
+        try:
+            return self.resolve_folder(http=http)
+        except Exception as e:
+            raise RuntimeError(f"업로드 폴더를 확정하지 못해 중단합니다: {e}") from e
+
+    # ---------- 업로드 ----------
+    def _create_file(self, uploaded_file, folder_id: str, *, http=None, on_progress=None) -> dict:
+        """업로드 파일 버퍼를 복사 없이 그대로 resumable 업로드 (http는 스레드마다 따로 넘길 것)."""
+        from googleapiclient.http import MediaIoBaseUpload
+
+        mime = getattr(uploaded_file, "type", None) or "application/octet-stream"
+        uploaded_file.seek(0)  # UploadedFile은 BytesIO → getvalue() 복사 없이 바로 스트리밍
+        media = MediaIoBaseUpload(uploaded_file, mimetype=mime, chunksize=self.CHUNK_SIZE, resumable=True)
+        request = self.drive.files().create(
+            body={"name": uploaded_file.name, "parents": [folder_id]},
+            media_body=media,
+            fields="id,name,mimeType,webViewLink,iconLink",
+            supportsAllDrives=True,
+        )
+        f = None
+        while f is None:
+            status, f = request.next_chunk(http=http)
+            if status and on_progress:
+                on_progress(status.resumable_progress)
+        if on_progress:
+            on_progress(media.size())
+        if not f.get("id"):
+            raise RuntimeError(f"Drive 파일 생성에 실패했습니다. 응답에 id가 없습니다: {f}")
+        return f
+
+    def _link_sharing_body(self):
+        if self.link_sharing == "anyone":
+            return {"role": "reader", "type": "anyone"}
+        if self.link_sharing == "domain":
+            return {"role": "reader", "type": "domain", "domain": self.org_domain, "allowFileDiscovery": False}
+        return None
+
+    def _share_files(self, file_ids: list, *, http=None):
+        """권한 부여를 batch 요청 한 번(100개 단위)으로. 조직 정책에 따라 실패할 수 있으므로 예외 허용."""
+        perm_body = self._link_sharing_body()
+        if not perm_body or not file_ids:
+            return
+        for start in range(0, len(file_ids), 100):
+            try:
+                batch = self.drive.new_batch_http_request()
+                for file_id in file_ids[start:start + 100]:
+                    # cannotModifyInheritedPermission(403) 등은 콜백에서 그냥 패스
+                    batch.add(
+                        self.drive.permissions().create(fileId=file_id, body=perm_body, supportsAllDrives=True),
+                        callback=lambda request_id, response, exception: None,
+                    )
+                timer = self.perf.timed("drive", "permissions.batch") if self.perf else contextlib.nullcontext()
+                with timer:
+                    batch.execute(http=http)
+            except Exception:
+                pass
+
+    def find_by_hash(self, sha256: str):
+        """같은 내용이 이미 Drive에 있으면 그 첨부 메타 (이 프로세스의 업로드 기록 + 시트의 첨부_JSON)."""
+        return self.uploaded_by_hash.get(sha256) or self.find_existing(sha256)
+
+    def _still_exists(self, meta: dict, *, http=None) -> bool:
+        """재사용하려는 Drive 파일이 아직 있고 휴지통에 없는지 (files.get 한 번). 확인 못 하면 새로 올림."""
+        try:
+            f = self.drive.files().get(
+                fileId=meta.get("id"), fields="id,trashed", supportsAllDrives=True,
+            ).execute(http=http)
+        except Exception as e:
+            log.debug("♻️ reuse check failed for %s: %r", meta.get("id"), e)
+            return False
+        return not f.get("trashed", False)
+
+    def _reusable(self, sha256: str, *, http=None):
+        """같은 내용의 기존 첨부 메타 — Drive에서 지워졌거나 휴지통에 있으면 None (→ 다시 업로드)."""
+        meta = self.find_by_hash(sha256)
+        if meta and not self._still_exists(meta, http=http):
+            self.uploaded_by_hash.pop(sha256, None)
+            return None
+        return meta
+
+    def upload_many(self, uploaded_files, on_progress=None):
+        """
+        여러 파일을 스레드 풀(최대 max_workers개)로 동시에 업로드하고 권한은 batch 한 번으로.
+        이미 올린 적 있는 내용(SHA-256 일치)은 전송 없이 기존 Drive 파일을 재사용 (지워졌거나 휴지통이면 다시 업로드).
+        on_progress(완료비율, 완료개수)는 호출한 스레드에서 호출됨.
+        반환: (첨부 메타 list — 입력 순서 유지, [(파일, 예외), ...])
+        """
+        hashes = [file_sha256(uf) for uf in uploaded_files]
+        http = self.http_factory()
+        known = {h: self._reusable(h, http=http) for h in set(hashes)}
+        # 새로 올릴 파일: 내용별로 처음 나온 것 하나만 (같은 등록 안의 중복 포함)
+        first_of = {}
+        for i, h in enumerate(hashes):
+            if not known[h]:
+                first_of.setdefault(h, i)
+        to_upload = sorted(first_of.values())
+
+        created, failed = {}, {}
+        if to_upload:
+            created, failed = self._upload_new_files(uploaded_files, to_upload, hashes, on_progress)
+        if on_progress:
+            on_progress(1.0, len(uploaded_files))
+
+        attachments, errors = [], []
+        for i, (uf, h) in enumerate(zip(uploaded_files, hashes)):
+            if known[h]:
+                attachments.append(_reuse_attachment(known[h], uf))
+            elif first_of[h] in failed:
+                errors.append((uf, failed[first_of[h]]))  # 같은 내용의 앞 파일이 실패했으면 이 파일도 실패
+            else:
+                meta = created[first_of[h]]
+                attachments.append(meta if first_of[h] == i else _reuse_attachment(meta, uf))
+        return attachments, errors
+
+    def _upload_new_files(self, uploaded_files, indices, hashes, on_progress=None):
+        """indices의 파일만 실제 업로드. 반환: ({i: 첨부 메타}, {i: 예외})"""
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        http = self.http_factory()  # 폴더 확인·권한 batch용 (이 작업 전용 연결)
+        try:
+            target_folder_id = self._ensure_folder(http=http)
+        except Exception as e:
+            return {}, {i: e for i in indices}  # 파일별 실패로 보고
+
+        sizes = [max(getattr(uf, "size", 0) or 0, 1) for uf in uploaded_files]
+        sent = [0 if i in indices else sizes[i] for i in range(len(uploaded_files))]  # 재사용분은 완료로 계산
+        # sent는 작업 스레드가 쓰고 호출한 스레드가 읽음 (int 대입이라 lock 불필요)
+
+        def work(i, uf):
+            def progress(n):
+                sent[i] = min(n, sizes[i])
+            # 파일마다 별도 연결
+            return self._create_file(uf, target_folder_id, http=self.http_factory(), on_progress=progress)
+
+        created, errors = {}, {}
+        done_before = len(uploaded_files) - len(indices)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(work, i, uploaded_files[i]): i for i in indices}
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=0.3, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    i = futures[fut]
+                    try:
+                        created[i] = fut.result()
+                    except Exception as e:
+                        errors[i] = e
+                    sent[i] = sizes[i]
+                if on_progress:
+                    on_progress(sum(sent) / sum(sizes), done_before + len(futures) - len(pending))
+
+        if any(is_folder_error(e) for e in errors.values()):
+            self.invalidate_folder()  # 폴더가 지워졌거나 권한이 바뀐 경우
+
+        self._share_files([created[i]["id"] for i in sorted(created)], http=http)
+        metas = {}
+        for i in sorted(created):
+            metas[i] = self.uploaded_by_hash[hashes[i]] = attachment_meta(created[i], hashes[i])
+        return metas, errors
+
+
+# ====== 첨부 미리보기 썸네일 (프로세스 공용 LRU) ======
+def make_thumbnail(data: bytes, max_px: int) -> bytes:
+    """이미지 바이트 → 긴 변 max_px 이하 WebP. 미리보기용이라 화질보다 크기 우선."""
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as im:
+        im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        im.thumbnail((max_px, max_px), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, "WEBP", quality=75, method=4)
+    return buf.getvalue()
+
+
+class ThumbnailCache:
+    """
+    key → 썸네일 바이트. 전체 크기가 max_bytes를 넘으면 가장 오래 안 쓴 것부터 버림.
+    만들기 실패(미리보기 불가 형식, 권한 없음 등)도 b""로 기억해 매번 다시 받지 않음.
+    """
+    ENTRY_OVERHEAD = 256  # 실패 항목도 무한히 쌓이지 않도록 항목당 최소 비용
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, make):
+        """있으면 바로, 없으면 make()로 만들어 저장. make는 lock 밖에서 호출 (네트워크 포함)."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        try:
+            data = make() or b""
+        except Exception:
+            log.exception("썸네일 생성 실패: %s", key)
+            data = b""
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = data
+                self.size += len(data) + self.ENTRY_OVERHEAD
+            while self.size > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.size -= len(old) + self.ENTRY_OVERHEAD
+        return data
+
+# ====== 등록 대기열 (write-behind) ======
+# - 번호는 프로세스 안에서 lock으로 한 번에 하나씩 배정 → 동시에 등록해도 겹치지 않음
+# - 작업 스레드 하나가 첨부 업로드 후, 잠깐(batch_window_sec) 모인 등록을 append 한 번으로 기록
+# - 쿼터 초과(429)로 끝내 실패한 묶음은 잠시 뒤 다시 시도, 그 외 실패는 해당 등록만 failed
+class Submission:
+    """등록 한 건의 진행 상태. status: pending → confirmed | failed"""
+
+    def __init__(self, no: int, fields: dict, files=None):
+        self.id = f"{no}-{time.monotonic_ns()}"
+        self.no = no
+        self.fields = fields          # {컬럼명: 값} (번호, 첨부_JSON 제외)
+        self.files = list(files or [])
+        self.attachments = None       # 업로드가 끝나면 첨부 메타 list
+        self.file_count = len(self.files)
+        self.upload_progress = 0.0    # 첨부 업로드 진행률 (0~1, 보낸 바이트 기준)
+        self.uploaded_count = 0       # 업로드(또는 재사용)를 마친 첨부 개수
+        self.status = "pending"
+        self.error = None
+        self.warnings = []            # 일부 첨부 업로드 실패 등 (등록은 진행)
+        self.submitted_at = time.time()
+        self.confirmed_at = None
+
+
+class SubmissionQueue:
+    QUOTA_RETRY_ROUNDS = 3  # _with_backoff 재시도까지 다 쓴 429 묶음을 다시 시도할 횟수
+    QUOTA_RETRY_SEC = 60    # 분당 쿼터가 다시 채워질 때까지 대기
+
+    def __init__(self, snapshot: QASnapshot, *, upload_fn=None, batch_window_sec=0.5, max_batch=50):
+        """
+        upload_fn(files, on_progress) → (첨부 메타 list, [(file, 예외), ...]) — 작업 스레드에서 호출됨.
+        on_progress(완료비율, 완료개수)로 받은 진행률은 Submission.upload_progress/uploaded_count에 기록.
+        """
+        self.snapshot = snapshot
+        self.upload_fn = upload_fn
+        self.batch_window_sec = batch_window_sec
+        self.max_batch = max_batch
+        self.tickets = {}             # id → Submission (상태 조회용)
+        self._queue = []
+        self._cond = threading.Condition()
+        self._next_no = None
+        self._worker = threading.Thread(target=self._run, name="qa-submit", daemon=True)
+        self._worker.start()
+
+    # ---------- 번호 배정 ----------
+    def _max_taken(self) -> int:
+        with self.snapshot.lock:
+            if not self.snapshot.header or "번호" not in self.snapshot.header:
+                return 0
+            no_col = self.snapshot.header.index("번호")
+            nos = [int(r[no_col]) for r in self.snapshot.rows if str(r[no_col]).strip().isdigit()]
+        return max(nos, default=0)
+
+    def _allocate(self, count=1) -> int:
+        # _cond 안에서 호출. 스냅샷 최대값과 이미 배정한 번호 중 큰 쪽부터 count개, 첫 번호 반환
+        self._next_no = max(self._next_no or 0, self._max_taken() + 1)
+        no = self._next_no
+        self._next_no += count
+        return no
+
+    def allocate_many(self, count: int) -> list:
+        """연속된 번호 count개를 한 번에 배정 (일괄 등록용). 등록 폼과 같은 배정기라 서로 겹치지 않음."""
+        with self._cond:
+            first = self._allocate(count)
+        return list(range(first, first + count))
+
+    TICKET_KEEP_SEC = 3600  # 끝난 등록의 상태는 이 시간만큼만 보관
+
+    def submit(self, fields: dict, files=None) -> Submission:
+        """번호를 배정하고 바로 반환. 실제 업로드/시트 기록은 작업 스레드에서."""
+        with self._cond:
+            expired = time.time() - self.TICKET_KEEP_SEC
+            for tid in [tid for tid, t in self.tickets.items() if t.status != "pending" and t.submitted_at < expired]:
+                del self.tickets[tid]
+            ticket = Submission(self._allocate(), dict(fields), files)
+            self.tickets[ticket.id] = ticket
+            self._queue.append(ticket)
+            self._cond.notify()
+        return ticket
+
+    def pending(self) -> list:
+        with self._cond:
+            return [t for t in self.tickets.values() if t.status == "pending"]
+
+    # ---------- 작업 스레드 ----------
+    def _take_batch(self) -> list:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+        time.sleep(self.batch_window_sec)  # 거의 동시에 들어온 등록을 한 번에 기록
+        with self._cond:
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                self._process(batch)
+            except Exception as e:
+                log.exception("등록 대기열 처리 실패")
+                self._fail(batch, e)
+
+    def _fail(self, batch, error):
+        for ticket in batch:
+            ticket.status = "failed"
+            ticket.error = error
+            ticket.files = []
+        self.snapshot.invalidate()
+
+    def _upload(self, ticket: Submission):
+        if ticket.attachments is not None:
+            return  # 재시도 묶음 — 이미 올린 파일은 다시 올리지 않음
+        attachments = []
+        if ticket.files and self.upload_fn is not None:
+            def progress(fraction, done):
+                ticket.upload_progress, ticket.uploaded_count = fraction, done
+            attachments, errors = self.upload_fn(ticket.files, progress)
+            for f, e in errors:
+                ticket.warnings.append(f"첨부 업로드 실패: {getattr(f, 'name', f)} — {e}")
+        ticket.attachments = attachments
+        ticket.files = []
+
+    def _renumber_collisions(self, batch):
+        # 다른 프로세스(다른 서버, 시트 직접 입력)가 먼저 쓴 번호와 겹치면 다시 배정
+        self.snapshot.invalidate(full=False)
+        self.snapshot.load()
+        with self.snapshot.lock:
+            no_col = self.snapshot.header.index("번호") if "번호" in self.snapshot.header else 0
+            taken = {str(r[no_col]) for r in self.snapshot.rows}
+        with self._cond:
+            for ticket in batch:
+                if str(ticket.no) in taken:
+                    ticket.no = self._allocate()
+
+    def _row(self, ticket: Submission) -> list:
+        values = dict(ticket.fields, 번호=str(ticket.no), 첨부_JSON=json.dumps(ticket.attachments or [], ensure_ascii=False))
+        header = self.snapshot.header or ["번호", "질문", "답변", "작성자", "작성일", "첨부_JSON"]
+        return [str(values.get(col, "")) for col in header]
+
+    def _process(self, batch):
+        for ticket in batch:
+            try:
+                self._upload(ticket)
+            except Exception as e:
+                ticket.warnings.append(f"첨부 업로드 실패: {e}")
+                ticket.attachments = []
+
+        for round_ in range(self.QUOTA_RETRY_ROUNDS + 1):
+            self._renumber_collisions(batch)
+            try:
+                self.snapshot.append_rows([self._row(t) for t in batch])
+                break
+            except gspread.exceptions.APIError as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if status != 429 or round_ == self.QUOTA_RETRY_ROUNDS:
+                    raise
+                log.warning("시트 쓰기 쿼터 초과 — %g초 뒤 다시 시도 (%d건)", self.QUOTA_RETRY_SEC, len(batch))
+                time.sleep(self.QUOTA_RETRY_SEC)
+
+        now = time.time()
+        for ticket in batch:
+            ticket.status = "confirmed"
+            ticket.confirmed_at = now
+
+# ====== 의미(임베딩) 기반 유사질문 ======
+# 문자 비교로는 못 잡는 바꿔 말한 질문("자동이체 신청" vs "계좌 자동결제 등록")을 잡기 위한 보조 검색.
+# 행 임베딩은 '번호:내용해시' 키로 디스크에 저장 → 새로 추가/수정된 행만 다시 인코딩.
+DEFAULT_EMBED_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+@functools.lru_cache(maxsize=None)
+def load_sentence_model(model_name: str = DEFAULT_EMBED_MODEL):
+    # torch/sentence-transformers는 무거우므로 처음 쓸 때 한 번만 import + 로드 (CPU 전용)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device="cpu")
+
+class SemanticIndex:
+    """스냅샷 행 순서대로 정렬된 정규화 임베딩 행렬 + 디스크 캐시. 코사인 = 내적."""
+
+    QUERY_CACHE_SIZE = 256
+
+    def __init__(self, cache_path: str, *, model_name=DEFAULT_EMBED_MODEL, model_loader=None,
+                 include_answer=False, batch_size=64):
+        self._lock = threading.Lock()
+        self.cache_path = cache_path
+        self.model_name = model_name
+        self.model_loader = model_loader or (lambda: load_sentence_model(model_name))
+        self.include_answer = include_answer   # True면 '질문 답변'을 함께 인코딩
+        self.batch_size = batch_size
+        self.disabled_reason = None   # 모델 로드 실패 시 사유 (이후 의미 검색은 건너뜀)
+        self.ready = False            # 모델 로드 + 전체 인코딩이 한 번 끝났는지 (warm 참고)
+        self._warm_lock = threading.Lock()  # warm 스레드 시작 여부만 (준비 중에도 바로 반환하도록 _lock과 분리)
+        self._warm_thread = None
+        self._vectors = {}            # "번호:sha1" → 벡터
+        self._queries = OrderedDict() # 질의문 → 벡터 (LRU)
+        self._df = None               # matrix가 맞춰진 스냅샷
+        self.matrix = None
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as z:
+                if str(z["model"]) == self.model_name:
+                    self._vectors = dict(zip(z["keys"].tolist(), z["vectors"]))
+        except (OSError, KeyError, ValueError):
+            self._vectors = {}
+
+    def _save_cache(self, vectors: dict):
+        if not vectors:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = self.cache_path + ".tmp.npz"
+        keys = list(vectors)
+        np.savez(tmp_path, model=np.array(self.model_name), keys=np.array(keys),
+                 vectors=np.stack([vectors[k] for k in keys]))
+        os.replace(tmp_path, self.cache_path)
+
+    def _encode(self, texts: list) -> np.ndarray:
+        vecs = self.model_loader().encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False,
+        )
+        return vecs.astype(np.float32)
+
+    def _embed_text(self, row) -> str:
+        q = str(row.get("질문", "")).strip()
+        if self.include_answer:
+            return f"{q} {str(row.get('답변', '')).strip()}".strip()
+        return q
+
+    # 모델 로드·인코딩(수십 초 걸릴 수 있음)은 self._lock 밖에서 하고, 다 만든 결과만 lock 안에서 교체
+    # → 준비 중에도 다른 스레드의 검색/조회가 lock에서 기다리지 않음
+    def _sync(self, df: pd.DataFrame) -> np.ndarray:
+        """df 행 순서에 맞춘 임베딩 행렬."""
+        with self._lock:
+            if self._df is df:
+                return self.matrix
+            known = self._vectors
+        texts = [self._embed_text(row) for row in df.to_dict("records")]
+        nos = df["번호"].tolist() if "번호" in df.columns else range(len(df))
+        keys = [f"{no}:{hashlib.sha1(t.encode('utf-8')).hexdigest()[:16]}" for no, t in zip(nos, texts)]
+        missing = [i for i, k in enumerate(keys) if k not in known]
+        new = dict(zip((keys[i] for i in missing), self._encode([texts[i] for i in missing]))) if missing else {}
+        with self._lock:
+            pool = {**known, **self._vectors, **new}  # 그 사이 다른 스레드가 정리한 벡터도 살려서 사용
+            stale = len(self._vectors) != len(set(keys))
+            self._vectors = vectors = {k: pool[k] for k in keys}  # 삭제/수정 전 버전 정리
+            dim = next(iter(vectors.values())).shape[0] if vectors else 0
+            matrix = np.stack([vectors[k] for k in keys]) if keys else np.zeros((0, dim), np.float32)
+            self.matrix, self._df = matrix, df
+        if missing or stale:
+            try:
+                self._save_cache(vectors)
+            except OSError:
+                pass  # 디스크 캐시는 부가 기능
+        return matrix
+
+    def _query_vector(self, text: str) -> np.ndarray:
+        with self._lock:
+            vec = self._queries.get(text)
+            if vec is not None:
+                self._queries.move_to_end(text)
+                return vec
+        vec = self._encode([text])[0]
+        with self._lock:
+            self._queries[text] = vec
+            if len(self._queries) > self.QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return vec
+
+    def warm(self, df: pd.DataFrame):
+        """모델 로드 + df 전체 인코딩을 미리 해 둠 (처음 한 번은 모델 다운로드/로드로 수십 초 걸릴 수 있음)."""
+        try:
+            self.model_loader()
+            self._sync(df)
+        except Exception as e:
+            self.disabled_reason = repr(e)
+            return
+        self.ready = True
+
+    def warm_in_background(self, df: pd.DataFrame):
+        """warm()을 데몬 스레드에서 한 번만 시작 (이미 준비됐거나 준비 중이면 아무것도 안 함)."""
+        with self._warm_lock:
+            if self.ready or self.disabled_reason or self._warm_thread is not None:
+                return
+            self._warm_thread = threading.Thread(target=self.warm, args=(df,), name="qa-semantic-warm", daemon=True)
+        self._warm_thread.start()
+
+    def search(self, df: pd.DataFrame, query, k=3, threshold=0.0) -> list:
+        """df 기준 (pos, 코사인) 상위 k개 중 threshold 이상, 점수 내림차순."""
+        query = str(query).strip()
+        if not query or self.disabled_reason:
+            return []
+        try:
+            matrix = self._sync(df)
+            q_vec = self._query_vector(query)
+        except Exception as e:  # 모델 미설치/다운로드 실패 등 → 문자 기반 비교만 사용
+            self.disabled_reason = repr(e)
+            return []
+        self.ready = True
+        if len(matrix) == 0:
+            return []
+        scores = matrix @ q_vec
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] >= threshold]
+
+    def best_matches(self, df: pd.DataFrame, queries: list) -> list:
+        """질의 여러 개를 한 번에 인코딩해 각각 df에서 가장 가까운 (pos, 코사인). 없으면 None (일괄 등록용)."""
+        texts = [str(q).strip() for q in queries]
+        if not texts or self.disabled_reason:
+            return [None] * len(texts)
+        try:
+            matrix = self._sync(df)
+            q_matrix = self._encode(texts)
+        except Exception as e:
+            self.disabled_reason = repr(e)
+            return [None] * len(texts)
+        if len(matrix) == 0:
+            return [None] * len(texts)
+        scores = matrix @ q_matrix.T  # (행 수, 질의 수)
+        best = scores.argmax(axis=0)
+        return [(int(pos), float(scores[pos, j])) if texts[j] else None for j, pos in enumerate(best)]
+
+
+# ====== 성능 계측 (시트/Drive 호출, 유사도·검색, 화면 렌더) ======
+# 호출마다 소요 시간·횟수를 모으고, 시트/Drive는 분당·세션별 사용량(쿼터 확인용)도 따로 셈.
+# 세션은 current_session(contextvar)으로 구분 — 작업 스레드에서 나간 호출은 "background".
+current_session = contextvars.ContextVar("qa_session", default="background")
+QUOTA_KINDS = ("sheets", "drive")
+
+
+class PerfStats:
+    MINUTES_KEPT = 60
+    SESSIONS_KEPT = 200
+
+    def __init__(self, *, emit_logs=False, logger=None):
+        self.emit_logs = emit_logs
+        self.logger = logger or log
+        self._lock = threading.Lock()
+        self.ops = {}                  # (kind, name) → {"count", "errors", "total_ms", "max_ms"}
+        self.per_minute = OrderedDict()  # epoch분 → Counter(kind)
+        self.per_session = OrderedDict() # 세션 → Counter(kind)
+
+    def record(self, kind: str, name: str, ms: float, ok=True):
+        session = current_session.get()
+        minute = int(time.time() // 60)
+        with self._lock:
+            op = self.ops.setdefault((kind, name), {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            op["count"] += 1
+            op["errors"] += 0 if ok else 1
+            op["total_ms"] += ms
+            op["max_ms"] = max(op["max_ms"], ms)
+            if kind in QUOTA_KINDS:
+                self.per_minute.setdefault(minute, Counter())[kind] += 1
+                while len(self.per_minute) > self.MINUTES_KEPT:
+                    self.per_minute.popitem(last=False)
+                per_session = self.per_session.setdefault(session, Counter())
+                per_session[kind] += 1
+                self.per_session.move_to_end(session)
+                while len(self.per_session) > self.SESSIONS_KEPT:
+                    self.per_session.popitem(last=False)
+            minute_count = self.per_minute[minute][kind] if kind in QUOTA_KINDS else None
+        if self.emit_logs:
+            entry = {"event": "perf", "kind": kind, "name": name, "ms": round(ms, 1), "ok": ok, "session": session}
+            if minute_count is not None:
+                entry["minute_count"] = minute_count  # 이번 분에 이 종류로 나간 호출 수 (쿼터 확인용)
+            self.logger.info(json.dumps(entry, ensure_ascii=False))
+
+    @contextlib.contextmanager
+    def timed(self, kind: str, name: str):
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(kind, name, (time.perf_counter() - started) * 1000, ok)
+
+    def summary(self) -> list:
+        """[{kind, name, count, errors, avg_ms, max_ms, total_ms}, ...] 총 소요 시간 큰 순."""
+        with self._lock:
+            rows = [
+                {"kind": kind, "name": name, "count": op["count"], "errors": op["errors"],
+                 "avg_ms": round(op["total_ms"] / op["count"], 1), "max_ms": round(op["max_ms"], 1),
+                 "total_ms": round(op["total_ms"], 1)}
+                for (kind, name), op in self.ops.items()
+            ]
+        return sorted(rows, key=lambda r: -r["total_ms"])
+
+    def quota_by_minute(self, minutes=10) -> list:
+        """최근 minutes분의 [(epoch분, {"sheets": n, "drive": n}), ...]"""
+        with self._lock:
+            return [(m, dict(c)) for m, c in list(self.per_minute.items())[-minutes:]]
+
+    def session_usage(self, session) -> dict:
+        with self._lock:
+            return dict(self.per_session.get(session, {}))
+
+
+def _api_op(method: str, url: str):
+    """요청 URL → (종류, 이름). 시트 ID·범위는 빼고 묶음 (예: "get values", "post values:append")."""
+    path = str(url).split("?")[0]
+    if "/drive/" in path:
+        return "drive", f"{method.lower()} files"
+    action = re.search(r":([a-z][A-Za-z]+)$", path)
+    resource = "values" if "/values" in path else "spreadsheet"
+    return "sheets", f"{method.lower()} {resource}" + (f":{action.group(1)}" if action else "")
+
+def instrument_gspread(gc, stats: PerfStats):
+    """gspread 클라이언트의 모든 API 호출(Client.request)을 계측. 시트 값/메타 + Drive REST(revision)."""
+    original = gc.request
+
+    def request(method, endpoint, *args, **kwargs):
+        with stats.timed(*_api_op(method, endpoint)):
+            return original(method, endpoint, *args, **kwargs)
+
+    gc.request = request
+    return gc
+
+def timed_http_request_class(stats: PerfStats):
+    """googleapiclient build(requestBuilder=...)용 HttpRequest — Drive 호출마다 methodId 이름으로 계측."""
+    from googleapiclient.http import HttpRequest
+
+    class TimedHttpRequest(HttpRequest):
+        def execute(self, http=None, num_retries=0):
+            with stats.timed("drive", self.methodId or self.method):
+                return super().execute(http=http, num_retries=num_retries)
+
+        def next_chunk(self, http=None, num_retries=0):
+            with stats.timed("drive", f"{self.methodId or self.method}:chunk"):
+                return super().next_chunk(http=http, num_retries=num_retries)
+
+    return TimedHttpRequest
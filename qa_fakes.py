@@ -0,0 +1,275 @@
+"""
+오프라인용 가짜 시트/Drive — 실제 시트·공유 드라이브 없이 qa_core 경로를 돌려 보기 위한 것 (bench.py에서 사용)
+- FakeWorksheet: qa_core가 쓰는 gspread Worksheet 메서드만 메모리 위에서 흉내
+- FakeDrive: app.py가 쓰는 googleapiclient Drive v3 호출 모양(files/permissions/batch)만 흉내
+- 둘 다 호출마다 latency_sec만큼 지연, quota_error_rate 확률로 429(쿼터 초과) 발생
+"""
+import itertools
+import json
+import random
+import re
+import threading
+import time
+
+import gspread
+from gspread.utils import a1_to_rowcol
+
+
+class _FakeResponse:
+    """gspread.exceptions.APIError가 읽는 requests.Response 흉내."""
+
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        self._body = {"error": {"code": status_code, "message": message, "status": "RESOURCE_EXHAUSTED"}}
+        self.text = json.dumps(self._body)
+
+    def json(self):
+        return self._body
+
+
+class _Faults:
+    def __init__(self, latency_sec=0.0, quota_error_rate=0.0, seed=None):
+        self.latency_sec = latency_sec
+        self.quota_error_rate = quota_error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.quota_errors = 0
+        self._lock = threading.Lock()
+
+    def hit(self, what: str) -> bool:
+        """호출 1회 — 지연 후 쿼터 오류를 낼지 여부."""
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        with self._lock:
+            self.calls += 1
+            if self.quota_error_rate and self.random.random() < self.quota_error_rate:
+                self.quota_errors += 1
+                return True
+        return False
+
+
+class _FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def batch_update(self, body: dict):
+        self.worksheet._call("spreadsheet.batch_update")
+        for req in body.get("requests", []):
+            rng = req["deleteDimension"]["range"]
+            with self.worksheet.lock:
+                del self.worksheet.values[rng["startIndex"]:rng["endIndex"]]
+                self.worksheet.revision += 1
+        return {}
+
+
+class FakeWorksheet:
+    """
+    시트 한 장 (values[0]이 헤더). revision은 값이 바뀔 때마다 1 증가 → QASnapshot(revision_fn=ws.get_revision).
+    """
+
+    id = 0
+
+    def __init__(self, values, *, latency_sec=0.0, quota_error_rate=0.0, seed=None):
+        self.values = [list(r) for r in values]
+        self.lock = threading.Lock()
+        self.revision = 1
+        self.faults = _Faults(latency_sec, quota_error_rate, seed)
+        self.spreadsheet = _FakeSpreadsheet(self)
+
+    def _call(self, what: str):
+        if self.faults.hit(what):
+            raise gspread.exceptions.APIError(_FakeResponse(429, f"Quota exceeded ({what})"))
+
+    def get_revision(self):
+        return str(self.revision)
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        with self.lock:
+            return [list(r) for r in self.values]
+
+    def col_values(self, col: int):
+        self._call("col_values")
+        with self.lock:
+            return [r[col - 1] if len(r) >= col else "" for r in self.values]
+
+    def get(self, range_name: str):
+        self._call("get")
+        start, _, end = range_name.partition(":")
+        r1, c1 = a1_to_rowcol(start)
+        r2, c2 = a1_to_rowcol(end) if end else (r1, c1)
+        with self.lock:
+            return [list(r[c1 - 1:c2]) for r in self.values[r1 - 1:r2]]
+
+    def append_rows(self, rows, value_input_option=None):
+        self._call("append_rows")
+        with self.lock:
+            self.values.extend(list(map(str, r)) for r in rows)
+            self.revision += 1
+        return {}
+
+    def batch_update(self, data, value_input_option=None):
+        self._call("batch_update")
+        with self.lock:
+            for item in data:
+                start, _, _ = item["range"].partition(":")
+                row, col = a1_to_rowcol(start)
+                while len(self.values) < row:
+                    self.values.append([])
+                target = self.values[row - 1]
+                for offset, value in enumerate(item["values"][0]):
+                    while len(target) < col + offset:
+                        target.append("")
+                    target[col - 1 + offset] = str(value)
+            self.revision += 1
+        return {}
+
+
+# ====== Drive ======
+class FakeDriveQuotaError(Exception):
+    """googleapiclient HttpError(429) 대신 (googleapiclient 없이도 돌도록)."""
+
+    status_code = 429
+
+
+class _Request:
+    def __init__(self, drive, what, result_fn):
+        self.drive = drive
+        self.what = what
+        self.result_fn = result_fn
+
+    def execute(self, http=None, num_retries=0):
+        self.drive._call(self.what)
+        return self.result_fn()
+
+
+class _UploadRequest:
+    """resumable 업로드 흉내: next_chunk()마다 media에서 chunksize만큼 읽음."""
+
+    def __init__(self, drive, body, media_body, fields):
+        self.drive = drive
+        self.body = body
+        self.media = media_body
+        self.sent = 0
+        self.data = bytearray()
+
+    def next_chunk(self, http=None, num_retries=0):
+        self.drive._call("files.create:chunk")
+        size = self.media.size()
+        chunk = self.media.chunksize() if self.media.resumable() else size
+        data = self.media.getbytes(self.sent, chunk) if size else b""
+        self.sent += len(data)
+        self.data += data
+        if self.sent < size:
+            return _Progress(self.sent, size), None
+        f = self.drive._store(self.body, self.media.mimetype(), size)
+        self.drive.contents[f["id"]] = bytes(self.data)
+        return None, f
+
+
+class _Progress:
+    def __init__(self, sent, total):
+        self.resumable_progress = sent
+        self.total_size = total
+
+
+class _Files:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def create(self, body=None, media_body=None, fields=None, supportsAllDrives=None):
+        if media_body is None:
+            return _Request(self.drive, "files.create", lambda: self.drive._store(body, body.get("mimeType"), 0))
+        return _UploadRequest(self.drive, body or {}, media_body, fields)
+
+    def get(self, fileId=None, fields=None, supportsAllDrives=None):
+        def result():
+            f = self.drive.files_by_id.get(fileId)
+            if f is None:
+                raise LookupError(f"file not found: {fileId}")
+            return dict(f, thumbnailLink=f"https://fake.drive/thumb/{fileId}=s220")
+        return _Request(self.drive, "files.get", result)
+
+    def get_media(self, fileId=None, supportsAllDrives=None):
+        return _Request(self.drive, "files.get_media", lambda: self.drive.contents.get(fileId, b""))
+
+    def list(self, q="", fields=None, pageSize=None, **kwargs):
+        def result():
+            names = re.findall(r"name\s*=\s*'([^']*)'", q)
+            found = [f for f in self.drive.files_by_id.values()
+                     if f.get("mimeType") == "application/vnd.google-apps.folder"
+                     and (not names or f.get("name") in names)]
+            return {"files": found[:pageSize or 100]}
+        return _Request(self.drive, "files.list", result)
+
+
+class _Permissions:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def create(self, fileId=None, body=None, supportsAllDrives=None):
+        def result():
+            self.drive.shared.setdefault(fileId, []).append(body)
+            return {"id": f"perm-{fileId}"}
+        return _Request(self.drive, "permissions.create", result)
+
+
+class _Batch:
+    def __init__(self, drive):
+        self.drive = drive
+        self.requests = []
+
+    def add(self, request, callback=None):
+        self.requests.append((request, callback))
+
+    def execute(self, http=None):
+        self.drive._call("batch")  # 배치는 HTTP 요청 1회
+        for i, (request, callback) in enumerate(self.requests):
+            try:
+                response, error = request.result_fn(), None
+            except Exception as e:
+                response, error = None, e
+            if callback:
+                callback(str(i), response, error)
+
+
+class FakeDrive:
+    """googleapiclient Drive v3 서비스 흉내. 업로드한 내용은 contents(id → bytes)에 보관."""
+
+    def __init__(self, *, latency_sec=0.0, quota_error_rate=0.0, seed=None, folders=("QA_Uploads",)):
+        self.faults = _Faults(latency_sec, quota_error_rate, seed)
+        self.files_by_id = {}
+        self.contents = {}
+        self.shared = {}     # id → 부여된 권한 body 목록
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        for name in folders:
+            self._store({"name": name, "mimeType": "application/vnd.google-apps.folder"}, None, 0)
+
+    def _call(self, what: str):
+        if self.faults.hit(what):
+            raise FakeDriveQuotaError(f"Rate limit exceeded ({what})")
+
+    def _store(self, body: dict, mime, size: int) -> dict:
+        with self._lock:
+            file_id = f"fake{next(self._ids):06d}"
+            f = {
+                "id": file_id,
+                "name": body.get("name"),
+                "mimeType": mime or body.get("mimeType") or "application/octet-stream",
+                "parents": body.get("parents", []),
+                "webViewLink": f"https://fake.drive/file/d/{file_id}/view",
+                "iconLink": "https://fake.drive/icon.png",
+                "size": size,
+            }
+            self.files_by_id[file_id] = f
+        return f
+
+    def files(self):
+        return _Files(self)
+
+    def permissions(self):
+        return _Permissions(self)
+
+    def new_batch_http_request(self):
+        return _Batch(self)
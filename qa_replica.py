@@ -0,0 +1,232 @@
+"""
+Q&A 시트의 로컬 SQLite 복제본 (선택 기능, 표준 라이브러리 sqlite3만 사용)
+- 스냅샷이 바뀔 때마다 행 단위 diff로 반영하고 change_log에 기록
+- FTS5(trigram) 키워드 검색 — 띄어쓰기·대소문자 무시, 공백 구분 단어 AND, bm25 순
+- 재시작 직후에도 시트를 기다리지 않고 복제본으로 바로 화면을 그릴 수 있음
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from qa_core import QASnapshot, normalize_for_search
+
+log = logging.getLogger(__name__)
+
+QA_COLUMNS = ["번호", "질문", "답변", "작성자", "작성일", "첨부_JSON"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS qa (
+    id INTEGER PRIMARY KEY,       -- 복제본 내부 id (= qa_fts rowid)
+    pos INTEGER NOT NULL,         -- 시트에서의 순서 (0부터)
+    "번호" TEXT NOT NULL,
+    "질문" TEXT NOT NULL DEFAULT '',
+    "답변" TEXT NOT NULL DEFAULT '',
+    "작성자" TEXT NOT NULL DEFAULT '',
+    "작성일" TEXT NOT NULL DEFAULT '',
+    "첨부_JSON" TEXT NOT NULL DEFAULT '',
+    row_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS qa_pos ON qa(pos);
+CREATE VIRTUAL TABLE IF NOT EXISTS qa_fts USING fts5(q, a, w, tokenize='trigram');
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,             -- insert | update | delete
+    "번호" TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_COLS_SQL = ", ".join(f'"{c}"' for c in QA_COLUMNS)
+_TRIGRAM = 3  # trigram 색인은 3글자 이상 단어만 MATCH 가능 → 더 짧으면 LIKE
+
+
+def _row_hash(values: list) -> str:
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _like(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+class SQLiteReplica:
+    """시트 행을 그대로 옮겨 둔 로컬 DB. 여러 스레드에서 써도 되도록 호출마다 연결을 새로 엶."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:  # 블록 단위 트랜잭션
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------- 시트 → 복제본 ----------
+    def sync(self, header: list, rows: list) -> dict:
+        """스냅샷 행 전체와 비교해 바뀐 행만 반영. 반환: {"insert": n, "update": n, "delete": n}"""
+        wanted = []
+        for row in rows:
+            values = [row[header.index(c)] if c in header else "" for c in QA_COLUMNS]
+            wanted.append((values, _row_hash(values)))
+
+        with self._write_lock, self._connect() as conn:
+            pool = {}  # (번호, hash) → [(id, pos), ...] — 아직 짝을 못 찾은 기존 행
+            for row_id, pos, no, h in conn.execute('SELECT id, pos, "번호", row_hash FROM qa ORDER BY pos'):
+                pool.setdefault((no, h), []).append((row_id, pos))
+
+            inserts, moves = [], []
+            for pos, (values, h) in enumerate(wanted):
+                same = pool.get((values[0], h))
+                if same:
+                    row_id, old_pos = same.pop(0)
+                    if old_pos != pos:
+                        moves.append((pos, row_id))
+                else:
+                    inserts.append((pos, values, h))
+            deletes = [(row_id, no) for (no, _), left in pool.items() for row_id, _ in left]
+
+            if deletes:
+                conn.executemany("DELETE FROM qa WHERE id = ?", [(i,) for i, _ in deletes])
+                conn.executemany("DELETE FROM qa_fts WHERE rowid = ?", [(i,) for i, _ in deletes])
+            if moves:
+                conn.executemany("UPDATE qa SET pos = ? WHERE id = ?", moves)
+            for pos, values, h in inserts:
+                cur = conn.execute(
+                    f"INSERT INTO qa (pos, {_COLS_SQL}, row_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [pos, *values, h],
+                )
+                conn.execute(
+                    "INSERT INTO qa_fts (rowid, q, a, w) VALUES (?, ?, ?, ?)",
+                    [cur.lastrowid, *(normalize_for_search(v) for v in values[1:4])],
+                )
+
+            # 같은 번호가 지워지고 다시 들어왔으면 수정으로 기록
+            deleted = {no for _, no in deletes}
+            inserted = {values[0] for _, values, _ in inserts}
+            now = time.time()
+            log_rows = (
+                [("update", no, now) for no in sorted(deleted & inserted)]
+                + [("insert", no, now) for no in sorted(inserted - deleted)]
+                + [("delete", no, now) for no in sorted(deleted - inserted)]
+            )
+            if log_rows:
+                conn.executemany('INSERT INTO change_log (op, "번호", at) VALUES (?, ?, ?)', log_rows)
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("header", json.dumps(list(header), ensure_ascii=False)), ("synced_at", str(now))],
+            )
+        return {
+            "insert": len(inserted - deleted),
+            "update": len(deleted & inserted),
+            "delete": len(deleted - inserted),
+        }
+
+    def attach(self, snapshot: QASnapshot) -> threading.Thread:
+        """
+        스냅샷이 바뀔 때마다(시트 재적재, 이 앱에서의 추가/수정/삭제) 복제본에 반영.
+        전체 행 비교라 반영은 전용 스레드에서 — 바꾼 쪽(화면/적재 스레드)은 기다리지 않고,
+        밀려 있는 동안 여러 번 바뀌었으면 마지막 상태만 한 번 반영.
+        """
+        changed = threading.Event()
+
+        def run():
+            while True:
+                changed.wait()
+                changed.clear()
+                with snapshot.lock:  # 행 목록은 교체식이라 얕은 복사로 충분
+                    header, rows = list(snapshot.header), list(snapshot.rows)
+                try:
+                    self.sync(header, rows)
+                except Exception:
+                    log.exception("복제본 반영 실패 — 다음 변경 때 다시 시도")
+
+        thread = threading.Thread(target=run, name="qa-replica-write", daemon=True)
+        thread.start()
+        snapshot.add_listener(lambda snap: changed.set())
+        return thread
+
+    # ---------- 읽기 ----------
+    def load(self):
+        """(헤더, 시트 순서의 행들). 아직 한 번도 동기화하지 않았으면 (None, [])."""
+        with self._connect() as conn:
+            meta = conn.execute("SELECT value FROM meta WHERE key = 'header'").fetchone()
+            if not meta:
+                return None, []
+            header = json.loads(meta[0])
+            data = conn.execute(f"SELECT {_COLS_SQL} FROM qa ORDER BY pos").fetchall()
+        rows = [[rec[QA_COLUMNS.index(c)] if c in QA_COLUMNS else "" for c in header] for rec in data]
+        return header, rows
+
+    def search(self, query="", writer="") -> list:
+        """
+        질문·답변 키워드(공백 구분 AND) + 작성자 → 번호 목록.
+        3글자 이상 키워드가 있으면 bm25 순(질문 가중 2배), 아니면 시트 순서.
+        """
+        terms = [normalize_for_search(t) for t in str(query).split()]
+        writer_terms = [normalize_for_search(t) for t in str(writer).split()]
+        if not terms and not writer_terms:
+            return []
+
+        match, where, params = [], [], []
+        for t in terms:
+            if len(t) >= _TRIGRAM:
+                match.append("{q a} : " + _phrase(t))
+            else:
+                where.append("(f.q LIKE ? ESCAPE '\\' OR f.a LIKE ? ESCAPE '\\')")
+                params += [_like(t), _like(t)]
+        for t in writer_terms:
+            if len(t) >= _TRIGRAM:
+                match.append("w : " + _phrase(t))
+            else:
+                where.append("f.w LIKE ? ESCAPE '\\'")
+                params.append(_like(t))
+        if match:
+            where.insert(0, "qa_fts MATCH ?")
+            params.insert(0, " AND ".join(match))
+        ranked = any(len(t) >= _TRIGRAM for t in terms)
+        order = "bm25(qa_fts, 2.0, 1.0, 1.0), qa.pos" if ranked else "qa.pos"
+        sql = (
+            'SELECT qa."번호" FROM qa_fts AS f JOIN qa ON qa.id = f.rowid '
+            f"WHERE {' AND '.join(where)} ORDER BY {order}"
+        )
+        with self._connect() as conn:
+            return [no for (no,) in conn.execute(sql, params)]
+
+    def changes_since(self, seq=0, limit=1000) -> list:
+        """change_log에서 seq 이후 변경 [(seq, op, 번호, at), ...] — 다른 프로세스가 따라잡기용."""
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT seq, op, "번호", at FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?',
+                (seq, limit),
+            ).fetchall()
+
+
+def start_background_sync(snapshot: QASnapshot, interval_sec: float) -> threading.Thread:
+    """데몬 스레드에서 주기적으로 snapshot.load() → 화면은 시트 응답을 기다리지 않음."""
+    def run():
+        while True:
+            time.sleep(interval_sec)
+            try:
+                snapshot.load()
+            except Exception:
+                log.exception("백그라운드 시트 동기화 실패 — 복제본/이전 스냅샷으로 계속 응답")
+
+    thread = threading.Thread(target=run, name="qa-replica-sync", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,216 @@
+"""
+읽기 전용 Q&A API (FastAPI) — Streamlit 세션 없이 현장 도구/챗봇이 지식베이스를 조회.
+- 시트는 백그라운드에서만 읽고(QA_REFRESH_SEC 간격), 요청은 메모리 스냅샷으로만 응답
+- 설정은 Streamlit과 같은 secrets.toml 사용 (기본 .streamlit/secrets.toml, QA_SECRETS_PATH로 변경)
+
+실행: uvicorn server:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import tomllib
+from contextlib import asynccontextmanager
+
+import gspread
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from google.oauth2.service_account import Credentials
+
+from qa_core import DEFAULT_EMBED_MODEL, QASnapshot, SemanticIndex, qa_record, sheet_revision
+from qa_bulk import iter_csv_chunks
+from qa_replica import SQLiteReplica
+
+log = logging.getLogger("qa_server")
+
+SECRETS_PATH = os.environ.get("QA_SECRETS_PATH", ".streamlit/secrets.toml")
+REFRESH_SEC = float(os.environ.get("QA_REFRESH_SEC", 30))
+SCOPES = [
+    "https://www.googleapis.com/auth/drive",
+    "https://www.googleapis.com/auth/spreadsheets",
+]
+
+
+def _load_secrets(path: str) -> dict:
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def _build_snapshot(secrets: dict) -> QASnapshot:
+    info = secrets["gcp_service_account"]
+    if isinstance(info, str):
+        info = json.loads(info)
+    creds = Credentials.from_service_account_info(info, scopes=SCOPES)
+    sheet_key = (secrets.get("google", {}) or {}).get("qa_sheet_key")
+    if not sheet_key:
+        raise RuntimeError("secrets에 [google].qa_sheet_key가 없습니다.")
+    gc = gspread.authorize(creds)
+    worksheet = gc.open_by_key(sheet_key).get_worksheet(0)
+    return QASnapshot(
+        worksheet,
+        sheet_key,
+        revision_fn=lambda: sheet_revision(gc, sheet_key),
+        ttl_sec=REFRESH_SEC,
+        on_warning=log.warning,
+    )
+
+
+def _load_and_index(snapshot: QASnapshot):
+    # 적재와 함께 검색 색인도 미리 만들어 둠 → 재적재 뒤 첫 /search 요청이 색인 생성을 기다리지 않음
+    df = snapshot.load()
+    snapshot.search_index(df)
+
+
+async def _refresh_forever(snapshot: QASnapshot):
+    while True:
+        await asyncio.sleep(REFRESH_SEC)
+        try:
+            await asyncio.to_thread(_load_and_index, snapshot)
+        except Exception:
+            log.exception("스냅샷 갱신 실패 — 이전 스냅샷으로 계속 응답")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    secrets = _load_secrets(SECRETS_PATH)
+    snapshot = _build_snapshot(secrets)
+    replica_path = secrets.get("local_replica_path", "")
+    app.state.replica = None
+    if replica_path:
+        # 복제본이 있으면 그걸로 바로 응답을 시작하고 시트 적재는 다음 갱신 주기에
+        replica = SQLiteReplica(replica_path)
+        header, rows = replica.load()
+        if header:
+            snapshot.seed(header, rows)
+        replica.attach(snapshot)
+        app.state.replica = replica
+    if snapshot.current() is None:
+        await asyncio.to_thread(_load_and_index, snapshot)
+    else:
+        await asyncio.to_thread(snapshot.search_index, snapshot.current())
+    app.state.snapshot = snapshot
+    app.state.semantic = None
+    if secrets.get("semantic_search", True):
+        app.state.semantic = SemanticIndex(
+            os.path.join(secrets.get("embedding_cache_dir", ".cache"), "qa_embeddings.npz"),
+            model_name=secrets.get("embedding_model", DEFAULT_EMBED_MODEL),
+            include_answer=bool(secrets.get("embedding_include_answer", False)),
+        )
+    task = asyncio.create_task(_refresh_forever(snapshot))
+    try:
+        yield
+    finally:
+        task.cancel()
+
+
+app = FastAPI(title="매니저 Q&A API", lifespan=lifespan)
+
+
+def _current_df():
+    df = app.state.snapshot.current()
+    if df is None:
+        raise HTTPException(status_code=503, detail="Q&A 데이터를 아직 불러오지 못했습니다.")
+    return df
+
+
+@app.get("/healthz")
+async def healthz():
+    df = app.state.snapshot.current()
+    return {"ok": df is not None, "rows": 0 if df is None else len(df)}
+
+
+@app.get("/search")
+async def search(
+    q: str = "",
+    writer: str = "",
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=100),
+):
+    """질문/답변 키워드(공백 구분 AND) + 작성자 검색. BM25 순 페이지 단위."""
+    if not q.strip() and not writer.strip():
+        raise HTTPException(status_code=400, detail="q 또는 writer 중 하나는 필요합니다.")
+    df = _current_df()
+    # 색인 검색(BM25)도 이벤트 루프를 막지 않도록 스레드에서
+    return await asyncio.to_thread(_search, df, q, writer, page, size)
+
+
+def _search(df, q: str, writer: str, page: int, size: int) -> dict:
+    hits = [pos for pos in app.state.snapshot.search_index(df).search(q, writer) if pos < len(df)]
+    items = [qa_record(df.iloc[pos]) for pos in hits[(page - 1) * size: page * size]]
+    return {"total": len(hits), "page": page, "pages": max(1, math.ceil(len(hits) / size)), "items": items}
+
+
+def _similar(df, q: str, k: int, threshold: float, semantic: bool, semantic_threshold: float) -> list:
+    # 문자 유사도(difflib ratio)와 의미 유사도(코사인)는 척도가 달라 섞어 정렬하지 않음:
+    # 문자 유사 결과를 먼저 점수순으로, 남는 자리만 의미 유사 결과(semantic_threshold 이상)로 채움
+    index = app.state.snapshot.question_index(df)
+    text = [(pos, r) for pos, r in index.top_k(q, k) if r >= threshold and pos < len(df)]
+    items = [dict(qa_record(df.iloc[pos]), match="text", score=round(r, 4)) for pos, r in text]
+    if semantic and app.state.semantic is not None and len(items) < k:
+        taken = {pos for pos, _ in text}
+        for pos, score in app.state.semantic.search(df, q, k):
+            if len(items) >= k:
+                break
+            if score >= semantic_threshold and pos not in taken and pos < len(df):
+                items.append(dict(qa_record(df.iloc[pos]), match="semantic", score=round(score, 4)))
+    return items
+
+
+@app.get("/similar")
+async def similar(
+    q: str,
+    k: int = Query(3, ge=1, le=20),
+    threshold: float = Query(0.65, ge=0.0, le=1.0),
+    semantic: bool = False,
+    semantic_threshold: float = Query(0.75, ge=0.0, le=1.0),
+):
+    """
+    유사질문 최대 k개. 문자 유사도(threshold 이상, match="text")를 먼저,
+    semantic=true면 남는 자리를 의미 유사도(semantic_threshold 이상, match="semantic")로 채움.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q가 비어 있습니다.")
+    df = _current_df()
+    # difflib/임베딩 계산은 이벤트 루프를 막지 않도록 스레드에서
+    items = await asyncio.to_thread(_similar, df, q, k, threshold, semantic, semantic_threshold)
+    return {"items": items}
+
+
+@app.get("/qa/{no}")
+async def get_qa(no: int):
+    """번호로 Q&A 한 건 조회."""
+    _current_df()
+    row = app.state.snapshot.get(no)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"번호 {no}가 없습니다.")
+    return qa_record(row)
+
+
+@app.get("/changes")
+async def changes(since: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=5000)):
+    """
+    복제본 change_log의 since 이후 변경 (로컬 복제본을 켠 경우만). 다른 도구가 전체를 다시 받지 않고 따라잡기용.
+    insert/update는 지금 행(row)도 함께, 그 사이 지워졌으면 row=None. 다음 요청은 since=next로.
+    """
+    replica = app.state.replica
+    if replica is None:
+        raise HTTPException(status_code=404, detail="로컬 복제본(local_replica_path)이 설정되지 않았습니다.")
+    log_rows = await asyncio.to_thread(replica.changes_since, since, limit)
+    snapshot = app.state.snapshot
+    items = []
+    for seq, op, no, at in log_rows:
+        row = None if op == "delete" else snapshot.get(no)
+        items.append({"seq": seq, "op": op, "번호": no, "at": at, "row": None if row is None else qa_record(row)})
+    return {"items": items, "next": log_rows[-1][0] if log_rows else since}
+
+
+@app.get("/export.csv")
+async def export_csv():
+    """전체 Q&A를 CSV(UTF-8 BOM)로 — 스냅샷 행을 조금씩 직렬화해 흘려보냄."""
+    _current_df()
+    return StreamingResponse(
+        iter_csv_chunks(app.state.snapshot),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="qa_export.csv"'},
+    )